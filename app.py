@@ -16,7 +16,11 @@ load_dotenv()
 
 try:
     from codetutorai.flow import create_tutorial_flow
-    from codetutorai.utils.constants import DEFAULT_CACHE_DIR, DEFAULT_OUTPUT_DIR
+    from codetutorai.utils.constants import (
+        DEFAULT_BATCH_SIZE,
+        DEFAULT_CACHE_DIR,
+        DEFAULT_OUTPUT_DIR,
+    )
     from codetutorai.utils.formatting import (
         format_duration,
         get_repo_info_from_url,
@@ -30,6 +34,7 @@ try:
     from codetutorai.utils.html_viewer import (
         open_html_viewer,  # Import the viewer function
     )
+    from codetutorai.utils.llm_client import clear_response_memo
 except ImportError as e:
     import traceback
 
@@ -68,7 +73,7 @@ def init_session_state():
         "fetch_repo_metadata": False,
         "max_chunk_size": 5000,
         "ordering_method": "auto",
-        "batch_size": 1,
+        "batch_size": DEFAULT_BATCH_SIZE,
         "cache_enabled": True,  # Default updated
         "cache_dir": DEFAULT_CACHE_DIR,
         "force_regeneration": False,  # Added state for forcing regeneration
@@ -556,6 +561,8 @@ if "clear_cache_button" in locals() and clear_cache_button:
             cache = diskcache.Cache(str(cache_dir_path))
             cache.clear()
             cache.close()  # Important to close the cache object
+            # Also drop the responses the LLM client memoized from this cache
+            clear_response_memo(str(cache_dir_path))
             st.success(f"Cache cleared successfully at: {cache_dir_path}")
             # Optionally remove the directory itself if empty, but clearing contents is safer
             # if not any(cache_dir_path.iterdir()):
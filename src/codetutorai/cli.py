@@ -12,6 +12,7 @@ from typing import List, Optional
 from dotenv import load_dotenv
 
 from codetutorai.flow import create_tutorial_flow
+from codetutorai.utils.constants import DEFAULT_BATCH_SIZE
 
 
 def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
@@ -99,8 +100,37 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=1,
-        help="Number of chapters to generate in parallel (default: 1)",
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Number of chapters to generate in parallel (default: {DEFAULT_BATCH_SIZE})",
+    )
+
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent LLM calls when identifying abstractions (default: 4)",
+    )
+
+    parser.add_argument(
+        "--ordering-model",
+        help="Model to use for LLM chapter ordering (default: the provider's default model)",
+    )
+
+    parser.add_argument(
+        "--writing-model",
+        help="Model to use for writing chapters (default: the provider's default model)",
+    )
+
+    parser.add_argument(
+        "--use-batch-api",
+        action="store_true",
+        help="Generate chapters through the OpenAI Batch API (lower cost; unfinished chapters are generated directly after an hour)",
+    )
+
+    parser.add_argument(
+        "--pretty-artifacts",
+        action="store_true",
+        help="Indent the intermediate JSON files written to the output directory",
     )
 
     parser.add_argument(
@@ -185,6 +215,11 @@ def main(args: Optional[List[str]] = None) -> int:
         else None,
         "max_chunk_size": args.max_chunk_size,
         "batch_size": args.batch_size,
+        "max_concurrency": args.max_concurrency,
+        "use_batch_api": args.use_batch_api,
+        "ordering_model": args.ordering_model,
+        "writing_model": args.writing_model,
+        "pretty_artifacts": args.pretty_artifacts,
         "output_formats": args.output_formats.split(","),
         "ordering_method": args.ordering_method,
         "fetch_repo_metadata": args.fetch_repo_metadata,
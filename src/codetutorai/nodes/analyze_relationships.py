@@ -6,11 +6,15 @@ between abstractions in a codebase.
 """
 
 import ast
-import json
+import hashlib
 import os
-from typing import Any, Dict, List, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import diskcache
 
 from codetutorai.nodes.node import Node
+from codetutorai.utils.json_utils import dumps_json, extract_json_array
 from codetutorai.utils.llm_client import LLMClient  # Import the client class
 
 
@@ -42,6 +46,8 @@ class ImportVisitor(ast.NodeVisitor):
 class AnalyzeRelationshipsNode(Node):
     """Node for analyzing relationships between abstractions in a codebase."""
 
+    __slots__ = ()
+
     def process(self, context):
         """Analyze relationships between abstractions in a codebase.
 
@@ -79,69 +85,78 @@ class AnalyzeRelationshipsNode(Node):
             raise ValueError("repo_dir is required in the context to read files.")
 
         # Instantiate the LLM client with caching settings
-        llm_client = LLMClient(
+        with LLMClient(
             provider=llm_provider,
             api_key=api_key,
             cache_enabled=cache_enabled,
             cache_dir=cache_dir,
             verbose=verbose,  # Pass verbose setting to client for cache logging
-        )
+        ) as llm_client:
+            # Read and analyze every referenced file once, up front, instead of once
+            # per abstraction that lists it
+            file_analyses = self._analyze_files(
+                abstractions, repo_dir, llm_client.cache, verbose
+            )
 
-        # Create a dictionary to store relationships
-        relationships = {}
+            # Create a mapping of lower-case abstraction names to original names
+            # This helps in case-insensitive matching later
+            lower_to_orig_abstraction = {a["name"].lower(): a["name"] for a in abstractions}
 
-        # Analyze relationships between abstractions
-        for i, abstraction in enumerate(abstractions):
-            if verbose:
-                print(
-                    f"Analyzing relationships for abstraction {i + 1}/{len(abstractions)}: {abstraction['name']}"
+            # Create a dictionary to store relationships
+            relationships = {}
+
+            # Analyze relationships between abstractions
+            for i, abstraction in enumerate(abstractions):
+                if verbose:
+                    print(
+                        f"Analyzing relationships for abstraction {i + 1}/{len(abstractions)}: {abstraction['name']}"
+                    )
+
+                # Find related abstractions
+                related_abstractions = self._find_related_abstractions(
+                    abstraction,
+                    abstractions,
+                    lower_to_orig_abstraction,
+                    file_analyses,
+                    llm_client,  # Pass the client instance
                 )
 
-            # Find related abstractions
-            related_abstractions = self._find_related_abstractions(
-                abstraction,
-                abstractions,
-                repo_dir,
-                llm_client,  # Pass the client instance
-                verbose,
-            )
+                # Store the relationships
+                relationships[abstraction["name"]] = related_abstractions
 
-            # Store the relationships
-            relationships[abstraction["name"]] = related_abstractions
+                if verbose:
+                    print(
+                        f"Found {len(related_abstractions)} related abstractions for {abstraction['name']}"
+                    )
 
             if verbose:
-                print(
-                    f"Found {len(related_abstractions)} related abstractions for {abstraction['name']}"
-                )
-
-        if verbose:
-            print("Relationship analysis complete!")
+                print("Relationship analysis complete!")
 
-        return {"relationships": relationships}
+            return {"relationships": relationships}
 
     def _find_related_abstractions(
         self,
         abstraction: Dict[str, Any],
         abstractions: List[Dict[str, Any]],
-        repo_dir: str,
+        lower_to_orig_abstraction: Dict[str, str],
+        file_analyses: Dict[str, Dict[str, Any]],
         llm_client: LLMClient,  # Changed parameters
-        verbose: bool,
     ) -> List[str]:
         """Find abstractions related to the given abstraction.
 
         Args:
             abstraction (dict): The abstraction to find related abstractions for
             abstractions (list): List of all abstractions
-            repo_dir (str): Local path to the cloned repository
+            lower_to_orig_abstraction (dict): Lower-case abstraction names mapped to original names
+            file_analyses (dict): Per-file analyses from _analyze_files
             llm_client (LLMClient): The LLM client instance
-            verbose (bool): Whether to print verbose output
 
         Returns:
             list: List of related abstraction names
         """
         # Find direct imports and references in the files
         direct_relations = self._find_direct_relations(
-            abstraction, abstractions, repo_dir, verbose
+            abstraction, lower_to_orig_abstraction, file_analyses
         )
 
         # Use LLM to find additional relationships (Temporarily disabled for performance)
@@ -161,99 +176,156 @@ class AnalyzeRelationshipsNode(Node):
 
         return related_abstractions
 
-    def _find_direct_relations(
+    def _analyze_files(
         self,
-        abstraction: Dict[str, Any],
         abstractions: List[Dict[str, Any]],
         repo_dir: str,
+        cache: Optional[diskcache.Cache],
         verbose: bool,
-    ) -> List[str]:
-        """Find direct relations between abstractions based on imports and references.
+    ) -> Dict[str, Dict[str, Any]]:
+        """Read and analyze every file referenced by the abstractions in one pass.
 
         Args:
-            abstraction (dict): The abstraction to find related abstractions for
             abstractions (list): List of all abstractions
             repo_dir (str): Local path to the cloned repository
+            cache (diskcache.Cache, optional): Cache for parsed imports, or None
             verbose (bool): Whether to print verbose output
 
         Returns:
-            list: List of related abstraction names
+            dict: Dictionary mapping file paths to their analysis, with keys:
+                - imports: Top-level packages imported by the file (Python only)
+                - content_lower: The lower-cased file content for reference search
+                Files that could not be read are omitted.
         """
-        related_abstractions = set()  # Use a set to avoid duplicates initially
-        processed_py_file = False  # Track if we processed any Python files
-        processed_content = False  # Flag to avoid reading content if not needed
+        # Unique file paths, in order of first reference
+        file_paths = list(
+            dict.fromkeys(file_path for a in abstractions for file_path in a.get("files", []))
+        )
 
-        # Get the files for this abstraction
-        abstraction_files = abstraction.get("files", [])
+        # Read and parse the files in parallel; the files are independent and
+        # reading them is I/O bound
+        with ThreadPoolExecutor() as executor:
+            analyses = executor.map(
+                lambda file_path: self._analyze_file(file_path, repo_dir, cache, verbose),
+                file_paths,
+            )
+            file_analyses = {
+                file_path: analysis
+                for file_path, analysis in zip(file_paths, analyses)
+                if analysis is not None
+            }
 
-        # Create a mapping of file paths to abstractions
-        file_to_abstraction = {}
-        for a in abstractions:
-            for file_path in a.get("files", []):
-                file_to_abstraction[file_path] = a["name"]
+        return file_analyses
 
-        # Create a mapping of lower-case abstraction names to original names
-        # This helps in case-insensitive matching later
-        lower_to_orig_abstraction = {a["name"].lower(): a["name"] for a in abstractions}
+    def _analyze_file(
+        self,
+        file_path: str,
+        repo_dir: str,
+        cache: Optional[diskcache.Cache],
+        verbose: bool,
+    ) -> Optional[Dict[str, Any]]:
+        """Read a single file and extract what relationship analysis needs from it.
 
-        # Check for imports and references in the files
-        for file_path in abstraction_files:
-            full_path = os.path.join(repo_dir, file_path)
-            if not os.path.exists(full_path):
-                if verbose:
-                    print(f"  Warning: File not found for direct analysis: {full_path}")
-                continue
+        Parsed imports are cached by content hash, so unchanged files skip the
+        AST parse on later runs.
 
-            # Read file content on demand
-            try:
-                with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                    file_content = f.read()
-                processed_content = True
-            except Exception as e:
-                if verbose:
-                    print(f"  Warning: Could not read file {full_path}: {e}")
-                continue
+        Args:
+            file_path (str): Relative path of the file
+            repo_dir (str): Local path to the cloned repository
+            cache (diskcache.Cache, optional): Cache for parsed imports, or None
+            verbose (bool): Whether to print verbose output
 
-            # --- AST Analysis for Python files ---
-            if file_path.endswith(".py"):
-                processed_py_file = True
-                try:
+        Returns:
+            dict or None: The file analysis (see _analyze_files), or None if unreadable
+        """
+        full_path = os.path.join(repo_dir, file_path)
+        if not os.path.exists(full_path):
+            if verbose:
+                print(f"  Warning: File not found for direct analysis: {full_path}")
+            return None
+
+        # Read file content
+        try:
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                file_content = f.read()
+        except Exception as e:
+            if verbose:
+                print(f"  Warning: Could not read file {full_path}: {e}")
+            return None
+
+        # --- AST Analysis for Python files ---
+        imports = set()
+        if file_path.endswith(".py"):
+            cache_key = None
+            cached_imports = None
+            if cache is not None:
+                content_hash = hashlib.sha256(file_content.encode("utf-8")).hexdigest()
+                cache_key = f"imports:{content_hash}"
+                cached_imports = cache.get(cache_key)
+
+            try:
+                if cached_imports is not None:
+                    imports = set(cached_imports)
+                else:
                     tree = ast.parse(file_content, filename=file_path)
                     visitor = ImportVisitor()
                     visitor.visit(tree)
+                    imports = visitor.imports
+                    if cache_key is not None:
+                        cache.set(cache_key, sorted(imports))
+            except SyntaxError as e:
+                if verbose:
+                    print(f"  Warning: Could not parse Python file {file_path}: {e}")
+            except Exception as e:  # Catch other potential AST errors
+                if verbose:
+                    print(f"  Warning: Error processing AST for {file_path}: {e}")
 
-                    # Check if imported modules correspond to other abstractions
-                    for imported_module in visitor.imports:
-                        # This matching is basic, might need refinement based on project structure
-                        # e.g., check if 'codetutorai.nodes.node' matches 'Node' abstraction
-                        for (
-                            abs_name_lower,
-                            abs_name_orig,
-                        ) in lower_to_orig_abstraction.items():
-                            # Check if import matches start of an abstraction name or vice-versa (simple check)
-                            if abs_name_lower.startswith(
-                                imported_module.lower()
-                            ) or imported_module.lower().startswith(abs_name_lower):
-                                if (
-                                    abs_name_orig != abstraction["name"]
-                                ):  # Avoid self-relation
-                                    related_abstractions.add(abs_name_orig)
-
-                except SyntaxError as e:
-                    if verbose:
-                        print(
-                            f"  Warning: Could not parse Python file {file_path}: {e}"
-                        )
-                except Exception as e:  # Catch other potential AST errors
-                    if verbose:
-                        print(f"  Warning: Error processing AST for {file_path}: {e}")
+        return {"imports": imports, "content_lower": file_content.lower()}
+
+    def _find_direct_relations(
+        self,
+        abstraction: Dict[str, Any],
+        lower_to_orig_abstraction: Dict[str, str],
+        file_analyses: Dict[str, Dict[str, Any]],
+    ) -> List[str]:
+        """Find direct relations between abstractions based on imports and references.
+
+        Args:
+            abstraction (dict): The abstraction to find related abstractions for
+            lower_to_orig_abstraction (dict): Lower-case abstraction names mapped to original names
+            file_analyses (dict): Per-file analyses from _analyze_files
+
+        Returns:
+            list: List of related abstraction names
+        """
+        related_abstractions = set()  # Use a set to avoid duplicates initially
+
+        # Check for imports and references in the files
+        for file_path in abstraction.get("files", []):
+            analysis = file_analyses.get(file_path)
+            if analysis is None:
+                continue
+
+            # Check if imported modules correspond to other abstractions
+            for imported_module in analysis["imports"]:
+                # This matching is basic, might need refinement based on project structure
+                # e.g., check if 'codetutorai.nodes.node' matches 'Node' abstraction
+                imported_lower = imported_module.lower()
+                for abs_name_lower, abs_name_orig in lower_to_orig_abstraction.items():
+                    # Check if import matches start of an abstraction name or vice-versa (simple check)
+                    if abs_name_lower.startswith(
+                        imported_lower
+                    ) or imported_lower.startswith(abs_name_lower):
+                        if abs_name_orig != abstraction["name"]:  # Avoid self-relation
+                            related_abstractions.add(abs_name_orig)
 
             # --- Fallback: Simple String Search for References (kept for now) ---
             # This is less reliable but catches mentions not found via imports/AST
+            content_lower = analysis["content_lower"]
             for abs_name_lower, abs_name_orig in lower_to_orig_abstraction.items():
                 if (
                     abs_name_orig != abstraction["name"]
-                    and abs_name_lower in file_content.lower()
+                    and abs_name_lower in content_lower
                 ):
                     related_abstractions.add(abs_name_orig)
 
@@ -318,7 +390,7 @@ Description: {abstraction["description"]}
 Files: {", ".join(abstraction.get("files", []))}
 
 # All Components in the Codebase
-{json.dumps(abstraction_names, indent=2)}
+{dumps_json(abstraction_names, indent=True)}
 
 # Task
 Identify which components from the list above are likely related to the current component "{abstraction["name"]}".
@@ -353,22 +425,20 @@ Only include components that have a meaningful relationship with the current com
         Returns:
             list: List of related abstraction names
         """
-        # Create a list of abstraction names
+        # Create a list of abstraction names, plus a set for membership checks
         abstraction_names = [a["name"] for a in abstractions]
+        abstraction_name_set = set(abstraction_names)
 
         # Try to parse the response as JSON
         try:
             # Find the JSON array in the response
-            start_idx = response.find("[")
-            end_idx = response.rfind("]") + 1
+            related_abstractions = extract_json_array(response, item_type=str)
 
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                related_abstractions = json.loads(json_str)
+            if related_abstractions is not None:
 
                 # Filter out invalid abstraction names
                 related_abstractions = [
-                    name for name in related_abstractions if name in abstraction_names
+                    name for name in related_abstractions if name in abstraction_name_set
                 ]
 
                 return related_abstractions
@@ -14,6 +14,8 @@ from codetutorai.utils.html_viewer import create_html_viewer, open_html_viewer
 class CombineTutorialNode(Node):
     """Node for combining tutorial chapters into a complete tutorial."""
 
+    __slots__ = ()
+
     def process(self, context):
         """Combine tutorial chapters into a complete tutorial.
 
@@ -260,28 +262,33 @@ This tutorial provides a comprehensive walkthrough of the {repo_name} codebase.
         <ul>
 """
 
+        # Build the rest of the page from parts joined once at the end, since
+        # the chapter contents make up most of the document
+        parts = [html_content]
+
         # Add table of contents
         for chapter in chapters:
-            html_content += f'            <li><a href="#chapter-{chapter["number"]}">{chapter["number"]}. {chapter["title"]}</a></li>\n'
+            parts.append(f'            <li><a href="#chapter-{chapter["number"]}">{chapter["number"]}. {chapter["title"]}</a></li>\n')
 
-        html_content += """        </ul>
+        parts.append("""        </ul>
     </div>
 
-"""
+""")
 
         # Add chapters
         for chapter in chapters:
-            html_content += (
+            parts.append(
                 f'    <div id="chapter-{chapter["number"]}" class="chapter">\n'
             )
-            html_content += f"        {chapter['content']}\n"
-            html_content += "    </div>\n\n"
+            parts.append(f"        {chapter['content']}\n")
+            parts.append("    </div>\n\n")
 
-        html_content += """    <div class="footer">
+        parts.append("""    <div class="footer">
         <p>This tutorial was generated by <a href="https://github.com/Mathews-Tom/CodeTutorAI">CodeTutorAI 🧑‍🏫 💻 🤖</a>, an intelligent codebase explainer.</p>
     </div>
 </body>
-</html>"""
+</html>""")
+        html_content = "".join(parts)
 
         # Write the HTML file
         with open(html_path, "w", encoding="utf-8") as f:
@@ -326,9 +333,8 @@ urlcolor: blue
 
 """
 
-        # Add chapters
-        for chapter in chapters:
-            pdf_content += f"{chapter['content']}\n\n"
+        # Add chapters, joined once rather than concatenated one by one
+        pdf_content += "".join(f"{chapter['content']}\n\n" for chapter in chapters)
 
         pdf_content += """---
 
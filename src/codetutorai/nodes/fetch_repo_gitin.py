@@ -8,6 +8,7 @@ import fnmatch
 import os
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
 from codetutorai.nodes.node import Node
@@ -16,6 +17,8 @@ from codetutorai.nodes.node import Node
 class FetchRepoGitinNode(Node):
     """Node for fetching a GitHub repository."""
 
+    __slots__ = ()
+
     def process(self, context):
         """Fetch a GitHub repository and extract its contents.
 
@@ -66,21 +69,30 @@ class FetchRepoGitinNode(Node):
         if verbose:
             print("Repository cloned successfully")
 
-        # Get the repository files
-        file_paths = self._get_repo_files(
-            repo_dir,
-            max_file_size,
-            max_files,
-            include_patterns,
-            exclude_patterns,
-            verbose,
-        )
+        # Read the repository metadata (README + `git log`) on a worker thread
+        # while the file tree is walked; the two are independent once cloned.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            metadata_future = executor.submit(
+                self._get_repo_metadata, repo_url, repo_dir, verbose
+            )
+
+            # Get the repository files
+            file_paths = self._get_repo_files(
+                repo_dir,
+                max_file_size,
+                max_files,
+                include_patterns,
+                exclude_patterns,
+                verbose,
+            )
 
-        if verbose:
-            print(f"Found {len(file_paths)} files matching criteria in the repository")
+            if verbose:
+                print(
+                    f"Found {len(file_paths)} files matching criteria in the repository"
+                )
 
-        # Get the repository metadata
-        metadata = self._get_repo_metadata(repo_url, repo_dir, verbose)
+            # Get the repository metadata
+            metadata = metadata_future.result()
 
         # Update the context
         return {
@@ -120,9 +132,11 @@ class FetchRepoGitinNode(Node):
         if os.path.exists(repo_dir):
             shutil.rmtree(repo_dir)
 
-        # Clone the repository
+        # Clone the repository. Only the latest commit is needed (the metadata
+        # reads `git log -1`), so a shallow single-branch clone avoids fetching
+        # the full history.
         try:
-            cmd = ["git", "clone", repo_url, repo_dir]
+            cmd = ["git", "clone", "--depth", "1", "--single-branch", repo_url, repo_dir]
             if not verbose:
                 cmd.append("--quiet")
 
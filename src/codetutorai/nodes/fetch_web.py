@@ -4,20 +4,49 @@ CodeTutorAI - Fetch Web Node
 This module contains the FetchWebNode class for fetching web content related to a repository.
 """
 
-import json
 import os
 from typing import Any, Dict
 from urllib.parse import urlparse
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from codetutorai.nodes.node import Node
+from codetutorai.utils.json_utils import dumps_json
+
+# Prefer the C-based lxml parser (several times faster than html.parser) when installed
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# Shared session, so connections are kept alive between fetches, with retries
+# and backoff for transient failures
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# Maximum number of characters of page text kept per page
+MAX_WEB_CONTENT_CHARS = 10000
 
 
 class FetchWebNode(Node):
     """Node for fetching web content related to a repository."""
 
+    __slots__ = ()
+
     def process(self, context):
         """Fetch web content related to a repository.
         
@@ -27,6 +56,8 @@ class FetchWebNode(Node):
                 - repo_name: Name of the repository
                 - output_dir: Output directory for the tutorial
                 - verbose: Whether to print verbose output
+                - pretty_artifacts: Whether to indent the JSON artifacts written
+                  to the output directory (default: compact)
                 
         Returns:
             dict: Dictionary containing the web content.
@@ -35,6 +66,7 @@ class FetchWebNode(Node):
         web_url = context.get("web_url")
         repo_name = context.get("repo_name", "")
         output_dir = context.get("output_dir", "tutorial_output")
+        pretty_artifacts = context.get("pretty_artifacts", False)
         
         if not web_url:
             if verbose:
@@ -56,7 +88,7 @@ class FetchWebNode(Node):
         # Save the web content to a file
         web_content_path = os.path.join(output_dir, "web_content.json")
         with open(web_content_path, "w", encoding="utf-8") as f:
-            json.dump(web_content, f, indent=2)
+            f.write(dumps_json(web_content, indent=pretty_artifacts))
         
         if verbose:
             print(f"Saved web content to {web_content_path}")
@@ -83,12 +115,12 @@ class FetchWebNode(Node):
             if verbose:
                 print(f"Fetching {web_url}...")
             
-            # Use requests to fetch the website
-            response = requests.get(web_url, timeout=10)
+            # Use the shared session to fetch the website
+            response = _SESSION.get(web_url, timeout=10)
             response.raise_for_status()
             
             # Parse the HTML
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = BeautifulSoup(response.text, HTML_PARSER)
             
             # Extract the title and content
             title = soup.title.string if soup.title else ""
@@ -102,6 +134,11 @@ class FetchWebNode(Node):
                 # Fall back to the body
                 content = soup.body.get_text(separator="\n", strip=True) if soup.body else ""
             
+            # Truncate the content once here, so the context, web_content.json and
+            # the downstream cache keys never carry the full page text
+            if len(content) > MAX_WEB_CONTENT_CHARS:
+                content = content[:MAX_WEB_CONTENT_CHARS] + "... [truncated]"
+            
             # Create the web content dictionary
             web_content = {
                 web_url: {
@@ -5,36 +5,59 @@ This module contains the IdentifyAbstractionsNode class for identifying key abst
 in a codebase.
 """
 
+import hashlib
 import json
 import os
 import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 from typing import Any, Dict, List, Set, Tuple
 
 from tqdm import tqdm
 
 from codetutorai.nodes.node import Node
+from codetutorai.utils.json_utils import dumps_json, extract_json_array, loads_json
 from codetutorai.utils.llm_client import LLMClient  # Import the client class
 
+# Patterns for the Markdown fallback in _parse_abstraction_response
+_NAME_RE = re.compile(r"(?:^|\n)#+\s+(.+?)(?:\n|$)", re.MULTILINE)
+_DESC_RE = re.compile(r"(?:^|\n)(?:Description|About):\s+(.+?)(?:\n|$)", re.MULTILINE)
+_FILES_RE = re.compile(r"(?:^|\n)(?:Files|Implements):\s+(.+?)(?:\n|$)", re.MULTILINE)
+
+# Kind words stripped from abstraction names in _canonical_name
+_AFFIX_RE = re.compile(
+    r"^(?:class|interface|struct|enum|type|module)\s+|\s+(?:class|interface|struct|enum|type|module)$"
+)
+
 
 class IdentifyAbstractionsNode(Node):
     """Node for identifying key abstractions in a codebase."""
 
+    __slots__ = ()
+
     def process(self, context):
         """Identify key abstractions in a codebase.
         
         Args:
             context (dict): The shared context dictionary containing:
                 - file_paths: List of relative file paths in the repository
-                - repo_dir: Local path to the cloned repository
                 - repo_name: Name of the repository
                 - repo_metadata: Repository metadata
                 - web_content: Web content related to the repository
                 - output_dir: Output directory for the tutorial
+                - max_chunk_size: Maximum size in characters of a file listing per LLM call
+                - max_concurrency: Maximum number of concurrent LLM calls
                 - llm_provider: LLM provider to use
                 - api_key: API key for the LLM provider
                 - verbose: Whether to print verbose output
                 - cache_enabled: Whether to enable LLM caching
                 - cache_dir: Directory for the LLM cache
+                - force_regeneration: Whether to ignore cached results
+                - language, depth: Tutorial settings, part of the abstractions cache key
+                - abstractions: Previously identified abstractions (optional, reused if present)
+                - pretty_artifacts: Whether to indent the JSON artifacts written
+                  to the output directory (default: compact)
 
         Returns:
             dict: Dictionary containing the identified abstractions.
@@ -42,76 +65,212 @@ class IdentifyAbstractionsNode(Node):
         verbose = context.get("verbose", False)
         file_paths = context.get("file_paths", [])
         repo_name = context.get("repo_name", "")
-        # repo_dir is needed if we decide to read file content here later
         repo_metadata = context.get("repo_metadata", {})
         web_content = context.get("web_content", {})
         output_dir = context.get("output_dir", "tutorial_output")
+        pretty_artifacts = context.get("pretty_artifacts", False)
+        max_chunk_size = context.get("max_chunk_size", 5000)
+        max_concurrency = max(1, context.get("max_concurrency", 4))
         llm_provider = context.get("llm_provider", "openai")
         api_key = context.get("api_key")
         cache_enabled = context.get("cache_enabled", False)
         cache_dir = context.get("cache_dir", ".llm_cache")
+        force_regeneration = context.get("force_regeneration", False)
+
+        abstractions_path = os.path.join(output_dir, "abstractions.json")
+
+        # Reuse abstractions already present in the context (e.g. a context
+        # restored from a previous run) instead of identifying them again
+        existing_abstractions = context.get("abstractions")
+        if existing_abstractions is not None and not force_regeneration:
+            if verbose:
+                print(
+                    f"Using {len(existing_abstractions)} abstractions already in the context"
+                )
+            with open(abstractions_path, "w", encoding="utf-8") as f:
+                f.write(dumps_json(existing_abstractions, indent=pretty_artifacts))
+            return {"abstractions": existing_abstractions}
 
         if verbose:
             print(f"Identifying abstractions in {len(file_paths)} files...")
-        
-        # Group files by directory
-        file_groups = self._group_files_by_directory(file_paths)
-        
-        if verbose:
-            print(f"Grouped files into {len(file_groups)} directories")
+
         # Instantiate the LLM client with caching settings
-        llm_client = LLMClient(
+        with LLMClient(
             provider=llm_provider,
             api_key=api_key,
             cache_enabled=cache_enabled,
             cache_dir=cache_dir,
             verbose=verbose # Pass verbose setting to client for cache logging
-        )
-        # Identify abstractions in each file group
-        abstractions = []
+        ) as llm_client:
+            # The web summary is the same for every shard, so build it once
+            web_summary = self._create_web_summary(web_content)
 
+            # Reuse the abstractions from a previous run over identical inputs
+            cached_abstractions_path = None
+            if cache_enabled:
+                cache_key = self._get_abstractions_cache_key(
+                    file_paths,
+                    repo_name,
+                    repo_metadata,
+                    web_summary,
+                    llm_provider,
+                    llm_client.model,
+                    {
+                        "max_chunk_size": max_chunk_size,
+                        "language": context.get("language", "en"),
+                        "depth": context.get("depth", "intermediate"),
+                    },
+                )
+                cached_abstractions_path = os.path.join(
+                    cache_dir, "abstractions", f"{cache_key}.json"
+                )
+                if not force_regeneration and os.path.exists(cached_abstractions_path):
+                    try:
+                        with open(cached_abstractions_path, "r", encoding="utf-8") as f:
+                            abstractions = loads_json(f.read())
+                    except (OSError, ValueError) as e:
+                        if verbose:
+                            print(f"Ignoring unreadable abstractions cache: {e}")
+                    else:
+                        if verbose:
+                            print(
+                                f"Loaded {len(abstractions)} cached abstractions from {cached_abstractions_path}"
+                            )
+                        with open(abstractions_path, "w", encoding="utf-8") as f:
+                            f.write(dumps_json(abstractions, indent=pretty_artifacts))
+                        return {"abstractions": abstractions}
+        
+            # Group files by directory
+            file_groups = self._group_files_by_directory(file_paths)
         
-        for group_name, group_file_paths in file_groups.items():
-            if verbose:
-                print(f"Identifying abstractions in {group_name}...")
-            
-            # Create a prompt for the LLM
-            prompt = self._create_abstraction_prompt(group_name, group_file_paths, repo_name, repo_metadata, web_content)
-            
-            # Call the LLM using the client instance
-            response = llm_client.call(
-                prompt,
-                # provider and api_key are handled by the client instance
-                max_tokens=2000,
-                temperature=0.7
-            )
-            
-            # Parse the response
-            group_abstractions = self._parse_abstraction_response(response, group_file_paths)
-            
-            # Add the abstractions to the list
-            abstractions.extend(group_abstractions)
-            
             if verbose:
-                print(f"Found {len(group_abstractions)} abstractions in {group_name}")
+                print(f"Grouped files into {len(file_groups)} directories")
+
+            # Split large directories into shards whose file listing fits the chunk size
+            shards = self._shard_file_groups(file_groups, max_chunk_size)
+
+            if verbose and len(shards) != len(file_groups):
+                print(f"Split {len(file_groups)} directories into {len(shards)} shards")
+
+            def identify_shard(shard):
+                """Identify the abstractions in a single shard (defined inside process)."""
+                group_name, group_file_paths = shard
+
+                if verbose:
+                    print(f"Identifying abstractions in {group_name}...")
+
+                # Create a prompt for the LLM
+                prompt = self._create_abstraction_prompt(group_name, group_file_paths, repo_name, repo_metadata, web_summary)
+
+                # Call the LLM using the client instance
+                response = llm_client.call(
+                    prompt,
+                    # provider and api_key are handled by the client instance
+                    max_tokens=2000,
+                    temperature=0.7,
+                    force_regeneration=force_regeneration,
+                )
+
+                # Parse the response
+                return self._parse_abstraction_response(response, group_file_paths)
+
+            # Identify abstractions in each shard in parallel; the shards are independent
+            # and the LLM calls are I/O bound, so wall time follows the slowest call.
+            # The worker count bounds the number of in-flight requests (rate limits).
+            shard_abstractions = [None] * len(shards)
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                futures = {
+                    executor.submit(identify_shard, shard): i
+                    for i, shard in enumerate(shards)
+                }
+
+                # Track progress as the calls complete, in whatever order they finish
+                with tqdm(
+                    total=len(futures),
+                    desc="Identifying abstractions",
+                    unit="group",
+                    disable=not verbose,
+                ) as pbar:
+                    for future in as_completed(futures):
+                        shard_abstractions[futures[future]] = future.result()
+                        pbar.update(1)
+
+            # Collect the abstractions in shard order
+            abstractions = []
+            for (group_name, _), group_abstractions in zip(shards, shard_abstractions):
+                abstractions.extend(group_abstractions)
+
+                if verbose:
+                    print(f"Found {len(group_abstractions)} abstractions in {group_name}")
         
-        # Deduplicate abstractions
-        abstractions = self._deduplicate_abstractions(abstractions)
+            # Deduplicate abstractions
+            abstractions = self._deduplicate_abstractions(abstractions)
         
-        if verbose:
-            print(f"Identified {len(abstractions)} unique abstractions")
+            if verbose:
+                print(f"Identified {len(abstractions)} unique abstractions")
         
-        # Save the abstractions to a file
-        abstractions_path = os.path.join(output_dir, "abstractions.json")
-        with open(abstractions_path, "w", encoding="utf-8") as f:
-            json.dump(abstractions, f, indent=2)
+            # Save the abstractions to a file
+            with open(abstractions_path, "w", encoding="utf-8") as f:
+                f.write(dumps_json(abstractions, indent=pretty_artifacts))
         
-        if verbose:
-            print(f"Saved abstractions to {abstractions_path}")
+            if verbose:
+                print(f"Saved abstractions to {abstractions_path}")
+
+            # Store the abstractions for future runs over the same inputs
+            if cached_abstractions_path:
+                os.makedirs(os.path.dirname(cached_abstractions_path), exist_ok=True)
+                with open(cached_abstractions_path, "w", encoding="utf-8") as f:
+                    f.write(dumps_json(abstractions))
         
-        # Update the context
-        return {"abstractions": abstractions}
+            # Update the context
+            return {"abstractions": abstractions}
     
+    def _get_abstractions_cache_key(
+        self,
+        file_paths: List[str],
+        repo_name: str,
+        repo_metadata: Dict[str, Any],
+        web_summary: str,
+        llm_provider: str,
+        llm_model: str,
+        settings: Dict[str, Any],
+    ) -> str:
+        """Compute a cache key for the abstractions identified from the given inputs.
+
+        The key covers exactly what the prompts are built from (the file paths, the
+        repository name and description and the web summary) together with the LLM
+        provider and model and the generation settings. File contents never reach
+        the prompts, so they are not read.
+
+        Args:
+            file_paths (list): List of relative file paths
+            repo_name (str): Name of the repository
+            repo_metadata (dict): Repository metadata
+            web_summary (str): Summary of the web content, from _create_web_summary
+            llm_provider (str): LLM provider used to identify the abstractions
+            llm_model (str): LLM model used to identify the abstractions
+            settings (dict): Generation settings of the run (chunk size, language, depth)
+
+        Returns:
+            str: Hex digest identifying the inputs
+        """
+        key_hash = hashlib.blake2b(digest_size=16)
+        key_hash.update(
+            json.dumps(
+                {
+                    "file_paths": sorted(file_paths),
+                    "repo_name": repo_name,
+                    "description": repo_metadata.get("description", ""),
+                    "web_summary": web_summary,
+                    "llm_provider": llm_provider,
+                    "llm_model": llm_model,
+                    "settings": settings,
+                },
+                sort_keys=True,
+            ).encode("utf-8")
+        )
+        return key_hash.hexdigest()
+
     def _group_files_by_directory(self, file_paths: List[str]) -> Dict[str, List[str]]:
         """Group files by directory.
 
@@ -124,30 +283,85 @@ class IdentifyAbstractionsNode(Node):
         file_groups = {}
         
         for file_path in file_paths:
-            # Get the directory path
-            dir_path = os.path.dirname(file_path) or "" # Handle root files
-            
-            # Use the directory name as the group name
-            if dir_path:
-                group_name = os.path.basename(dir_path)
-            else:
-                group_name = "root"
+            # Use the name of the file's parent directory as the group name. Plain
+            # string splits on "/" give the same result as os.path.dirname and
+            # basename without their per-call overhead (on Windows the native
+            # separator is normalized first)
+            normalized_path = file_path.replace(os.sep, "/") if os.altsep else file_path
+            dir_path, _, _ = normalized_path.rpartition("/")
+            group_name = dir_path.rpartition("/")[2] if dir_path else "root"
             
             # Add the file to the group
-            if group_name not in file_groups:
-                file_groups[group_name] = []
-
-            file_groups[group_name].append(file_path)
+            file_groups.setdefault(group_name, []).append(file_path)
         
         return file_groups
     
+    def _shard_file_groups(
+        self, file_groups: Dict[str, List[str]], max_chunk_size: int
+    ) -> List[Tuple[str, List[str]]]:
+        """Split file groups into shards whose file listing fits the chunk size.
+
+        Args:
+            file_groups (dict): Dictionary mapping group names to lists of file paths
+            max_chunk_size (int): Maximum size in characters of a shard's file listing
+
+        Returns:
+            list: List of (group name, file paths) tuples, one per shard
+        """
+        shards = []
+
+        for group_name, group_file_paths in file_groups.items():
+            group_shards = []
+            current = []
+            current_size = 0
+
+            for file_path in group_file_paths:
+                # Each file is listed as "- <path>\n" in the prompt
+                entry_size = len(file_path) + 3
+                if current and current_size + entry_size > max_chunk_size:
+                    group_shards.append(current)
+                    current = []
+                    current_size = 0
+                current.append(file_path)
+                current_size += entry_size
+
+            if current:
+                group_shards.append(current)
+
+            if len(group_shards) == 1:
+                shards.append((group_name, group_shards[0]))
+            else:
+                for i, shard_file_paths in enumerate(group_shards):
+                    shards.append(
+                        (f"{group_name} (part {i + 1}/{len(group_shards)})", shard_file_paths)
+                    )
+
+        return shards
+
+    def _create_web_summary(self, web_content: Dict[str, Dict[str, str]]) -> str:
+        """Create a summary of the web content for the abstraction prompts.
+
+        Args:
+            web_content (dict): Web content related to the repository
+
+        Returns:
+            str: The web content summary, or an empty string if there is none
+        """
+        if not web_content:
+            return ""
+
+        return "# Web Content\n" + "".join(
+            f"## {page.get('title', 'Untitled')}\n{page.get('content', '')[:500]}...\n\n"
+            for page in islice(web_content.values(), 3)  # Limit to 3 pages
+        )
+
     def _create_abstraction_prompt(
         self, 
         group_name: str,
         group_file_paths: List[str],
         repo_name: str,
         repo_metadata: Dict[str, Any],
-        web_content: Dict[str, Dict[str, str]]
+        web_summary: str
     ) -> str:
         """Create a prompt for the LLM to identify abstractions.
 
@@ -156,21 +370,13 @@ class IdentifyAbstractionsNode(Node):
             group_file_paths (list): List of file paths in this group
             repo_name (str): Name of the repository
             repo_metadata (dict): Repository metadata
-            web_content (dict): Web content related to the repository
+            web_summary (str): Summary of the web content, from _create_web_summary
 
         Returns:
             str: The prompt for the LLM
         """
         # Create a summary of the files
-        file_summary = "\n".join([f"- {file_path}" for file_path in group_file_paths])
-        
-        # Create a summary of the web content
-        web_summary = ""
-        if web_content:
-            web_summary = "# Web Content\n"
-            for url, page in list(web_content.items())[:3]:  # Limit to 3 pages
-                web_summary += f"## {page.get('title', 'Untitled')}\n"
-                web_summary += f"{page.get('content', '')[:500]}...\n\n"
+        file_summary = "\n".join(f"- {file_path}" for file_path in group_file_paths)
         
         # Create the prompt
         prompt = f"""
@@ -232,12 +438,9 @@ Focus on identifying meaningful abstractions that would be helpful for understan
         # Try to parse the response as JSON
         try:
             # Find the JSON array in the response
-            start_idx = response.find("[")
-            end_idx = response.rfind("]") + 1
+            abstractions = extract_json_array(response, item_type=dict)
             
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                abstractions = json.loads(json_str)
+            if abstractions is not None:
                 
                 # Validate the abstractions
                 valid_abstractions = []
@@ -252,27 +455,30 @@ Focus on identifying meaningful abstractions that would be helpful for understan
                         
                         valid_abstractions.append(abstraction)
                 
-                return valid_abstractions
+                # An array without a single valid abstraction is not the answer
+                # (e.g. a stray list in the prose), so fall back to the markdown
+                if valid_abstractions:
+                    return valid_abstractions
         except Exception:
             pass
         
-        # If JSON parsing fails, try to extract abstractions using regex
+        # If JSON parsing fails or finds no abstractions, try to extract
+        # abstractions using regex
         abstractions = []
         
         # Look for abstraction names and descriptions
-        name_pattern = r"(?:^|\n)#+\s+(.+?)(?:\n|$)"
-        desc_pattern = r"(?:^|\n)(?:Description|About):\s+(.+?)(?:\n|$)"
-        files_pattern = r"(?:^|\n)(?:Files|Implements):\s+(.+?)(?:\n|$)"
-        
-        for match in re.finditer(name_pattern, response, re.MULTILINE):
+        for match in _NAME_RE.finditer(response):
             name = match.group(1).strip()
             
+            # Search from the end of the name, without copying the rest of the response
+            start = match.end()
+
             # Look for a description
-            desc_match = re.search(desc_pattern, response[match.end():], re.MULTILINE)
+            desc_match = _DESC_RE.search(response, start)
             description = desc_match.group(1).strip() if desc_match else ""
             
             # Look for files
-            files_match = re.search(files_pattern, response[match.end():], re.MULTILINE)
+            files_match = _FILES_RE.search(response, start)
             files_str = files_match.group(1).strip() if files_match else ""
             files = [file.strip() for file in files_str.split(",")]
             
@@ -297,29 +503,45 @@ Focus on identifying meaningful abstractions that would be helpful for understan
         Returns:
             list: List of deduplicated abstraction dictionaries
         """
-        # Create a mapping of abstraction names to indices
-        name_to_index = {}
-        for i, abstraction in enumerate(abstractions):
-            name = abstraction["name"].lower()
-            if name in name_to_index:
-                # Merge the abstractions
-                existing_idx = name_to_index[name]
-                existing = abstractions[existing_idx]
-                
+        # First abstraction seen for each canonical name, in order (dicts keep order)
+        merged = {}
+        # Merged file sets per name, built once and updated in place
+        merged_files = {}
+        # Spellings of each name as returned by the LLM
+        spellings = {}
+        for abstraction in abstractions:
+            name = self._canonical_name(abstraction["name"])
+            spellings.setdefault(name, Counter())[abstraction["name"]] += 1
+            existing = merged.get(name)
+            if existing is not None:
                 # Merge the descriptions
                 if len(abstraction["description"]) > len(existing["description"]):
                     existing["description"] = abstraction["description"]
                 
                 # Merge the files
-                existing["files"] = list(set(existing["files"] + abstraction["files"]))
+                merged_files[name].update(dict.fromkeys(abstraction["files"]))
             else:
-                name_to_index[name] = i
+                merged[name] = abstraction
+                merged_files[name] = dict.fromkeys(abstraction["files"])
         
-        # Create a new list with the deduplicated abstractions
-        deduplicated = []
-        for i, abstraction in enumerate(abstractions):
-            name = abstraction["name"].lower()
-            if name_to_index[name] == i:
-                deduplicated.append(abstraction)
+        # Finalize the merged abstractions
+        for name, abstraction in merged.items():
+            # Use the most common spelling (the first seen wins ties)
+            abstraction["name"] = spellings[name].most_common(1)[0][0]
+            abstraction["files"] = list(merged_files[name])
         
-        return deduplicated
+        return list(merged.values())
+
+    def _canonical_name(self, name: str) -> str:
+        """Normalize an abstraction name for deduplication.
+
+        Lowercases the name and drops a leading or trailing kind word, so that
+        "Class Parser", "parser class" and "Parser" are treated as the same.
+
+        Args:
+            name (str): Abstraction name as returned by the LLM
+
+        Returns:
+            str: Canonical name
+        """
+        return _AFFIX_RE.sub("", name.strip().lower()).strip()
@@ -8,6 +8,9 @@ This module contains the base Node class for the CodeTutorAI workflow.
 class Node:
     """Base class for all workflow nodes."""
 
+    # Nodes are stateless (everything lives in the context), so no instance dict
+    __slots__ = ()
+
     def process(self, context):
         """Process the node's task using the given context.
 
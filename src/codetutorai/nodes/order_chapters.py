@@ -4,17 +4,38 @@ CodeTutorAI - Order Chapters Node
 This module contains the OrderChaptersNode class for ordering tutorial chapters.
 """
 
-import json
+import heapq
 import os
+from collections import Counter
 from typing import Any, Dict, List, Set, Tuple
 
 from codetutorai.nodes.node import Node
-from codetutorai.utils.call_llm import call_llm
+from codetutorai.utils.json_utils import dumps_json, extract_json_array
+from codetutorai.utils.llm_client import LLMClient  # Import the client class
+
+# Structured output format for LLM ordering: an object holding the ordered names
+ORDERING_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "chapter_order",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "order": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["order"],
+            "additionalProperties": False,
+        },
+    },
+}
 
 
 class OrderChaptersNode(Node):
     """Node for ordering tutorial chapters."""
 
+    __slots__ = ()
+
     def process(self, context):
         """Order tutorial chapters based on dependencies and learning curve.
         
@@ -28,6 +49,13 @@ class OrderChaptersNode(Node):
                 - llm_provider: LLM provider to use
                 - api_key: API key for the LLM provider
                 - verbose: Whether to print verbose output
+                - cache_enabled: Whether to enable LLM caching
+                - cache_dir: Directory for the LLM cache
+                - force_regeneration: Whether to ignore cached results
+                - ordering_model: Model to use for LLM ordering (optional, defaults
+                  to the provider's default model)
+                - pretty_artifacts: Whether to indent the JSON artifacts written
+                  to the output directory (default: compact)
                 
         Returns:
             dict: Dictionary containing the ordered chapters.
@@ -40,6 +68,11 @@ class OrderChaptersNode(Node):
         ordering_method = context.get("ordering_method", "auto")
         llm_provider = context.get("llm_provider", "openai")
         api_key = context.get("api_key")
+        cache_enabled = context.get("cache_enabled", False)
+        cache_dir = context.get("cache_dir", ".llm_cache")
+        force_regeneration = context.get("force_regeneration", False)
+        ordering_model = context.get("ordering_model")
+        pretty_artifacts = context.get("pretty_artifacts", False)
         
         if verbose:
             print(f"Ordering {len(abstractions)} chapters using method: {ordering_method}")
@@ -50,10 +83,25 @@ class OrderChaptersNode(Node):
         elif ordering_method == "learning_curve":
             ordered_chapters = self._order_learning_curve(abstractions, relationships, verbose)
         elif ordering_method == "llm":
-            ordered_chapters = self._order_llm(abstractions, relationships, repo_name, llm_provider, api_key, verbose)
+            # Instantiate the LLM client with caching settings
+            with LLMClient(
+                provider=llm_provider,
+                api_key=api_key,
+                model=ordering_model,  # Ordering is a small task; a cheaper model suffices
+                cache_enabled=cache_enabled,
+                cache_dir=cache_dir,
+                verbose=verbose,  # Pass verbose setting to client for cache logging
+            ) as llm_client:
+                ordered_chapters = self._order_llm(
+                    abstractions, relationships, repo_name, llm_client, force_regeneration, verbose
+                )
         else:  # auto
-            # Try topological ordering first, then fall back to learning curve
-            ordered_chapters = self._order_topological(abstractions, relationships, verbose)
+            # Try topological ordering first, using the learning curve to order
+            # chapters within each dependency layer, then learning curve alone if
+            # nothing could be ordered
+            ordered_chapters = self._order_topological(
+                abstractions, relationships, verbose, prioritize_simple=True
+            )
             if not ordered_chapters:
                 ordered_chapters = self._order_learning_curve(abstractions, relationships, verbose)
         
@@ -63,7 +111,7 @@ class OrderChaptersNode(Node):
         # Save the ordered chapters to a file
         ordered_chapters_path = os.path.join(output_dir, "ordered_chapters.json")
         with open(ordered_chapters_path, "w", encoding="utf-8") as f:
-            json.dump(ordered_chapters, f, indent=2)
+            f.write(dumps_json(ordered_chapters, indent=pretty_artifacts))
         
         if verbose:
             print(f"Saved ordered chapters to {ordered_chapters_path}")
@@ -75,7 +123,8 @@ class OrderChaptersNode(Node):
         self, 
         abstractions: List[Dict[str, Any]], 
         relationships: Dict[str, List[str]], 
-        verbose: bool
+        verbose: bool,
+        prioritize_simple: bool = False
     ) -> List[str]:
         """Order chapters using topological sorting based on dependencies.
         
@@ -83,6 +132,8 @@ class OrderChaptersNode(Node):
             abstractions (list): List of abstractions
             relationships (dict): Dictionary of relationships between abstractions
             verbose (bool): Whether to print verbose output
+            prioritize_simple (bool): Whether to order chapters that are ready at the
+                same time by complexity (simplest first) instead of input order
             
         Returns:
             list: List of ordered chapter titles
@@ -90,48 +141,83 @@ class OrderChaptersNode(Node):
         if verbose:
             print("Using topological ordering")
         
-        # Create a graph of dependencies
-        graph = {}
+        # Map names to integer IDs once, so the graph is plain lists indexed by ID
+        # (duplicate names collapse to their first occurrence)
+        name_to_id = {}
         for abstraction in abstractions:
-            name = abstraction["name"]
-            graph[name] = set(relationships.get(name, []))
+            name_to_id.setdefault(abstraction["name"], len(name_to_id))
+        id_to_name = list(name_to_id)
+        n = len(id_to_name)
         
-        # Perform topological sort
-        visited = set()
-        temp_visited = set()
-        order = []
+        # Create a graph of dependencies, ignoring self-edges and edges to unknown
+        # abstractions
+        graph = [[] for _ in range(n)]
+        in_degree = [0] * n
+        for name, source in name_to_id.items():
+            # dict.fromkeys drops duplicate edges while keeping a stable order
+            for neighbor in dict.fromkeys(relationships.get(name, [])):
+                target = name_to_id.get(neighbor)
+                if target is not None and target != source:
+                    graph[source].append(target)
+                    in_degree[target] += 1
         
-        def visit(node):
-            if node in temp_visited:
-                # Cycle detected
-                return False
-            if node in visited:
-                return True
-            
-            temp_visited.add(node)
-            
-            for neighbor in graph.get(node, []):
-                if neighbor in graph and not visit(neighbor):
-                    return False
-            
-            temp_visited.remove(node)
-            visited.add(node)
-            order.append(node)
-            return True
+        # Perform topological sort (Kahn's algorithm), one layer of ready chapters
+        # at a time. When no chapter is ready but some are left, they sit on
+        # cycles: break the cycle at the chapter with the fewest unresolved
+        # dependencies (simplest first on ties), taken from a min-heap, and carry
+        # on with the sort.
+        complexity = None
+        if prioritize_simple:
+            complexity = self._compute_complexity(abstractions, relationships)
+        layer = [node for node in range(n) if in_degree[node] == 0]
+        done = [False] * n
+        order = []
+        heap = None
         
-        # Visit each node
-        for node in graph:
-            if node not in visited:
-                if not visit(node):
-                    # Cycle detected, topological sort not possible
+        while len(order) < n:
+            if not layer:
+                if heap is None:
                     if verbose:
-                        print("Cycle detected, topological sort not possible")
-                    return []
-        
-        # Reverse the order to get the correct topological sort
-        order.reverse()
+                        print("Cycle detected, breaking cycles at the least constrained chapters")
+                    if complexity is None:
+                        complexity = self._compute_complexity(abstractions, relationships)
+                    heap = [
+                        (in_degree[node], complexity[id_to_name[node]], node)
+                        for node in range(n)
+                        if not done[node]
+                    ]
+                    heapq.heapify(heap)
+                # Skip stale heap entries (chapters already placed or whose
+                # in-degree has dropped since they were pushed)
+                while True:
+                    degree, _, node = heapq.heappop(heap)
+                    if not done[node] and degree == in_degree[node]:
+                        break
+                layer = [node]
+            elif prioritize_simple:
+                # Chapters in the same layer have no ordering constraint between
+                # them, so present the simplest first
+                layer.sort(key=lambda node: complexity[id_to_name[node]])
+            
+            next_layer = []
+            for node in layer:
+                done[node] = True
+                order.append(node)
+                
+                for neighbor in graph[node]:
+                    if done[neighbor]:
+                        continue
+                    in_degree[neighbor] -= 1
+                    if in_degree[neighbor] == 0:
+                        next_layer.append(neighbor)
+                    elif heap is not None:
+                        heapq.heappush(
+                            heap,
+                            (in_degree[neighbor], complexity[id_to_name[neighbor]], neighbor),
+                        )
+            layer = next_layer
         
-        return order
+        return [id_to_name[node] for node in order]
     
     def _order_learning_curve(
         self, 
@@ -153,6 +239,40 @@ class OrderChaptersNode(Node):
             print("Using learning curve ordering")
         
         # Calculate the complexity of each abstraction based on its relationships
+        complexity = self._compute_complexity(abstractions, relationships)
+        
+        # Count how many other abstractions depend on each one, in a single pass
+        # over the relationships
+        dependents = Counter(
+            target
+            for source, targets in relationships.items()
+            for target in set(targets)
+            if target != source
+        )
+        
+        # Sort abstractions by complexity; among equally complex ones, put the
+        # most depended-on (foundational) abstractions first
+        ordered_chapters = sorted(
+            [a["name"] for a in abstractions],
+            key=lambda name: (complexity.get(name, 0), -dependents[name]),
+        )
+        
+        return ordered_chapters
+    
+    def _compute_complexity(
+        self,
+        abstractions: List[Dict[str, Any]],
+        relationships: Dict[str, List[str]],
+    ) -> Dict[str, int]:
+        """Compute the complexity of each abstraction.
+
+        Args:
+            abstractions (list): List of abstractions
+            relationships (dict): Dictionary of relationships between abstractions
+
+        Returns:
+            dict: Mapping of abstraction names to complexity scores
+        """
         complexity = {}
         for abstraction in abstractions:
             name = abstraction["name"]
@@ -160,19 +280,15 @@ class OrderChaptersNode(Node):
             num_relationships = len(relationships.get(name, []))
             num_files = len(abstraction.get("files", []))
             complexity[name] = num_relationships + num_files
-        
-        # Sort abstractions by complexity
-        ordered_chapters = sorted([a["name"] for a in abstractions], key=lambda name: complexity.get(name, 0))
-        
-        return ordered_chapters
-    
+        return complexity
+
     def _order_llm(
         self, 
         abstractions: List[Dict[str, Any]], 
         relationships: Dict[str, List[str]], 
         repo_name: str,
-        llm_provider: str,
-        api_key: str,
+        llm_client: LLMClient,
+        force_regeneration: bool,
         verbose: bool
     ) -> List[str]:
         """Order chapters using an LLM to determine the best learning sequence.
@@ -181,8 +297,8 @@ class OrderChaptersNode(Node):
             abstractions (list): List of abstractions
             relationships (dict): Dictionary of relationships between abstractions
             repo_name (str): Name of the repository
-            llm_provider (str): LLM provider to use
-            api_key (str): API key for the LLM provider
+            llm_client (LLMClient): The LLM client instance to use
+            force_regeneration (bool): Whether to bypass the LLM cache
             verbose (bool): Whether to print verbose output
             
         Returns:
@@ -194,16 +310,23 @@ class OrderChaptersNode(Node):
         # Create a prompt for the LLM
         prompt = self._create_ordering_prompt(abstractions, relationships, repo_name)
         
-        # Call the LLM
-        response = call_llm(
-            prompt, 
-            provider=llm_provider, 
-            api_key=api_key,
-            max_tokens=1000,
-            temperature=0.7
+        # Ask for a schema-valid {"order": [...]} object when the model supports
+        # structured output, so the response always parses
+        response_format = None
+        if llm_client.supports_structured_output():
+            response_format = ORDERING_RESPONSE_FORMAT
+        
+        # Call the LLM using the client instance (cached responses are reused)
+        response = llm_client.call(
+            prompt,
+            max_tokens=500,  # The response is a short JSON array of names
+            temperature=0.7,
+            force_regeneration=force_regeneration,
+            response_format=response_format,
         )
         
-        # Parse the response
+        # Parse the response (the "order" array of a structured response is its
+        # first JSON array, so the same parser handles both forms)
         ordered_chapters = self._parse_ordering_response(response, abstractions)
         
         return ordered_chapters
@@ -225,15 +348,17 @@ class OrderChaptersNode(Node):
             str: The prompt for the LLM
         """
         # Create a summary of the abstractions
-        abstractions_summary = ""
-        for i, abstraction in enumerate(abstractions):
-            abstractions_summary += f"{i+1}. {abstraction['name']}: {abstraction['description']}\n"
+        abstractions_summary = "".join(
+            f"{i+1}. {abstraction['name']}: {abstraction['description']}\n"
+            for i, abstraction in enumerate(abstractions)
+        )
         
         # Create a summary of the relationships
-        relationships_summary = ""
-        for name, related in relationships.items():
-            if related:
-                relationships_summary += f"{name} -> {', '.join(related)}\n"
+        relationships_summary = "".join(
+            f"{name} -> {', '.join(related)}\n"
+            for name, related in relationships.items()
+            if related
+        )
         
         # Create the prompt
         prompt = f"""
@@ -270,29 +395,30 @@ Ensure that all abstractions are included in the output.
         Returns:
             list: List of ordered chapter titles
         """
-        # Create a list of abstraction names
+        # Create a list of abstraction names, plus a set for membership tests
         abstraction_names = [a["name"] for a in abstractions]
+        abstraction_name_set = set(abstraction_names)
         
         # Try to parse the response as JSON
         try:
             # Find the JSON array in the response
-            start_idx = response.find("[")
-            end_idx = response.rfind("]") + 1
+            ordered_chapters = extract_json_array(response, item_type=str)
             
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                ordered_chapters = json.loads(json_str)
+            if ordered_chapters is not None:
                 
                 # Validate the ordered chapters
                 valid_chapters = []
+                seen = set()
                 for chapter in ordered_chapters:
-                    if chapter in abstraction_names:
+                    if chapter in abstraction_name_set and chapter not in seen:
                         valid_chapters.append(chapter)
+                        seen.add(chapter)
                 
                 # Add any missing abstractions to the end
                 for name in abstraction_names:
-                    if name not in valid_chapters:
+                    if name not in seen:
                         valid_chapters.append(name)
+                        seen.add(name)
                 
                 return valid_chapters
         except Exception:
@@ -7,19 +7,63 @@ This module contains the WriteChaptersNode class for generating tutorial chapter
 import json
 import os
 import time
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
 from tqdm import tqdm
 
 from codetutorai.nodes.node import Node
+from codetutorai.utils.constants import DEFAULT_BATCH_SIZE
 from codetutorai.utils.diagram_generator import generate_diagrams
-from codetutorai.utils.llm_client import LLMClient  # Import the client class
+from codetutorai.utils.llm_client import LLMClient, TokenCounter
+
+# Token budget shared by the file contents included in a chapter prompt
+CHAPTER_FILE_TOKEN_BUDGET = 3000
+
+# Depth-specific instructions for the chapter system message
+_DEPTH_INSTRUCTIONS = {
+    "basic": """
+- Focus on high-level concepts and simple explanations
+- Avoid complex technical details
+- Use simple code examples
+- Explain concepts in a way that beginners can understand
+""",
+    "intermediate": """
+- Balance conceptual explanations with technical details
+- Include relevant code examples
+- Explain important interactions with other components
+- Assume the reader has some programming experience
+""",
+    "advanced": """
+- Include in-depth technical details
+- Explain complex interactions and edge cases
+- Use detailed code examples
+- Assume the reader has a strong technical background
+""",
+}
+
+# Output format instructions for the chapter system message
+_OUTPUT_FORMAT_INSTRUCTIONS = """
+# Output Format
+Write a comprehensive tutorial chapter in Markdown format. Include:
+1. A clear heading with the chapter number and title
+2. An introduction explaining the purpose and importance of this component
+3. Detailed explanations of how the component works
+4. Code examples with explanations
+5. Interactions with other components
+6. Best practices and common patterns
+7. A summary of key points
+
+Make the tutorial engaging, clear, and informative. Use proper Markdown formatting for headings, code blocks, lists, etc.
+"""
 
 
 class WriteChaptersNode(Node):
     """Node for generating tutorial chapters."""
 
+    __slots__ = ()
+
     def process(self, context):
         """Generate tutorial chapters based on the ordered abstractions.
 
@@ -40,13 +84,18 @@ class WriteChaptersNode(Node):
                 - generate_diagrams: Whether to generate diagrams
                 - cache_enabled: Whether to enable LLM caching
                 - cache_dir: Directory for the LLM cache
+                - force_regeneration: Whether to ignore cached results
+                - writing_model: Model to use for writing chapters (optional,
+                  defaults to the provider's default model)
+                - use_batch_api: Whether to generate the chapters through the
+                  provider's Batch API (OpenAI only; cheaper but slower)
 
         Returns:
             None: The context is updated directly with the generated chapters.
         """
         verbose = context.get("verbose", False)
         output_dir = context.get("output_dir", "tutorial_output")
-        batch_size = context.get("batch_size", 1)
+        batch_size = max(1, context.get("batch_size", DEFAULT_BATCH_SIZE))
         llm_provider = context.get("llm_provider", "openai")
         api_key = context.get("api_key")
         depth = context.get("depth", "intermediate")
@@ -56,6 +105,9 @@ class WriteChaptersNode(Node):
         )  # Renamed to avoid shadowing imported function
         cache_enabled = context.get("cache_enabled", False)
         cache_dir = context.get("cache_dir", ".llm_cache")
+        force_regeneration = context.get("force_regeneration", False)
+        use_batch_api = context.get("use_batch_api", False)
+        writing_model = context.get("writing_model")
         repo_dir = context.get("repo_dir")  # Needed for reading files
 
         # Get the ordered chapters
@@ -108,131 +160,258 @@ class WriteChaptersNode(Node):
             if verbose:
                 print(f"Saved diagrams to {diagrams_dir}")
         # Instantiate the LLM client with caching settings
-        llm_client = LLMClient(
+        with LLMClient(
             provider=llm_provider,
             api_key=api_key,
+            model=writing_model,
             cache_enabled=cache_enabled,
             cache_dir=cache_dir,
             verbose=verbose,  # Pass verbose setting to client for cache logging
-        )
-
-        # Generate chapters in parallel
-        chapters = []
-
-        def generate_chapter(chapter_index):
-            """Generate a single chapter (defined inside process)."""
-            # Note: This function uses variables from the outer scope (process method)
-            # like llm_client, abstractions, relationships, repo_dir, etc.
+        ) as llm_client:
+            # The instructions shared by every chapter are built once and sent first
+            system_message = self._create_chapter_system_message(
+                ordered_chapters, depth, language, diagrams
+            )
 
-            chapter_title = ordered_chapters[chapter_index]
-            chapter_number = chapter_index + 1
+            # Index the abstractions by name for the per-chapter lookup
+            abstractions_by_name = {a["name"]: a for a in reversed(abstractions)}
+
+            # Index the related abstractions by name in both directions once, so each
+            # chapter sees the components it uses and the ones that use it
+            related_by_name = {}
+            for source, targets in relationships.items():
+                for target in targets:
+                    if target == source:
+                        continue
+                    related_by_name.setdefault(source, {})[target] = None
+                    related_by_name.setdefault(target, {})[source] = None
+
+            # Truncated file contents shared by the chapters that include the same
+            # file, so each file is read and tokenized once per token share
+            file_contents = {}
+
+            def create_prompt(abstraction, chapter_number):
+                """Create the chapter-specific prompt for an abstraction (defined inside process)."""
+                # Get the related abstractions
+                related_abstractions = list(related_by_name.get(abstraction["name"], {}))
+
+                # Note: _create_chapter_prompt is a method of the class, so use self.
+                return self._create_chapter_prompt(
+                    abstraction,
+                    related_abstractions,
+                    repo_dir,  # Pass repo_dir
+                    chapter_number,
+                    llm_client.token_counter,
+                    file_contents,
+                )
 
-            # Find the abstraction for this chapter
-            abstraction = None
-            for a in abstractions:
-                if a["name"] == chapter_title:
-                    abstraction = a
-                    break
+            # With the Batch API, submit every chapter prompt as one batch job up
+            # front; generate_chapter then picks up the responses instead of calling
+            # the LLM itself
+            batch_responses = None
+            if use_batch_api:
+                if llm_provider.lower() != "openai":
+                    if verbose:
+                        print(
+                            f"Batch API is not supported for {llm_provider}, generating chapters individually"
+                        )
+                else:
+                    prompts = {}
+                    for chapter_index, chapter_title in enumerate(ordered_chapters):
+                        abstraction = abstractions_by_name.get(chapter_title)
+                        if abstraction:
+                            chapter_number = chapter_index + 1
+                            prompts[f"chapter_{chapter_number:02d}"] = create_prompt(
+                                abstraction, chapter_number
+                            )
+
+                    if verbose:
+                        print(f"Submitting {len(prompts)} chapters to the Batch API...")
+
+                    batch_responses = llm_client.call_batch(
+                        prompts,
+                        max_tokens=4000,
+                        temperature=0.7,
+                        system_message=system_message,
+                        force_regeneration=force_regeneration,
+                    )
+
+            # Generate chapters in parallel
+            chapters = []
+
+            def generate_chapter(chapter_index):
+                """Generate a single chapter (defined inside process)."""
+                # Note: This function uses variables from the outer scope (process method)
+                # like llm_client, abstractions, relationships, repo_dir, etc.
+
+                chapter_title = ordered_chapters[chapter_index]
+                chapter_number = chapter_index + 1
+
+                # Find the abstraction for this chapter
+                abstraction = abstractions_by_name.get(chapter_title)
+
+                if not abstraction:
+                    if verbose:
+                        print(f"Warning: No abstraction found for chapter {chapter_title}")
+                    return {
+                        "title": chapter_title,
+                        "content": f"# Chapter {chapter_number}: {chapter_title}\n\nNo content available for this chapter.",
+                        "number": chapter_number,
+                        "filename": f"chapter_{chapter_number:02d}.md",
+                    }
+
+                # Create the chapter filename
+                chapter_filename = f"chapter_{chapter_number:02d}.md"
+
+                if batch_responses is not None:
+                    # Use the response from the batch job
+                    chapter_content = batch_responses[f"chapter_{chapter_number:02d}"]
+                else:
+                    # Create the prompt for the LLM
+                    prompt = create_prompt(abstraction, chapter_number)
+
+                    # Call the LLM
+                    chapter_content = (
+                        llm_client.call(  # Use the client instance from outer scope
+                            prompt,
+                            # provider and api_key are handled by the client instance
+                            max_tokens=4000,
+                            temperature=0.7,
+                            system_message=system_message,
+                            force_regeneration=force_regeneration,
+                        )
+                    )
+
+                # Format the chapter content
+                # Note: _format_chapter_content is a method of the class, so use self.
+                chapter_content = self._format_chapter_content(
+                    chapter_content, chapter_number, chapter_title
+                )
 
-            if not abstraction:
+                # Save the chapter to a file. This runs on the worker thread right
+                # after its LLM call, so writes overlap with the other chapters'
+                # requests instead of queueing behind the result collection. The
+                # content goes to a temporary file that is then renamed over the
+                # chapter, so an interrupted run never leaves a truncated chapter.
+                chapter_path = Path(chapters_dir, chapter_filename)
+                tmp_path = chapter_path.with_name(chapter_filename + ".tmp")
+                tmp_path.write_text(chapter_content, encoding="utf-8")
+                tmp_path.replace(chapter_path)
+
+                # Print completion message if verbose
                 if verbose:
-                    print(f"Warning: No abstraction found for chapter {chapter_title}")
+                    print(f"Generated chapter {chapter_number}: {chapter_title}")
+
                 return {
                     "title": chapter_title,
-                    "content": f"# Chapter {chapter_number}: {chapter_title}\n\nNo content available for this chapter.",
+                    "content": chapter_content,
                     "number": chapter_number,
-                    "filename": f"chapter_{chapter_number:02d}.md",
+                    "filename": chapter_filename,
                 }
 
-            # Get the abstraction details
-            abstraction_name = abstraction["name"]
-            abstraction_description = abstraction.get("description", "")
-            abstraction_files = abstraction.get("files", [])
-
-            # Get the related abstractions
-            related_abstractions = relationships.get(abstraction_name, [])
-
-            # Create the prompt for the LLM
-            # Note: _create_chapter_prompt is a method of the class, so use self.
-            prompt = self._create_chapter_prompt(
-                abstraction,
-                related_abstractions,
-                repo_dir,  # Pass repo_dir
-                chapter_number,
-                depth,
-                language,
-                diagrams,
-            )
-
-            # Call the LLM
-            chapter_content = (
-                llm_client.call(  # Use the client instance from outer scope
-                    prompt,
-                    # provider and api_key are handled by the client instance
-                    max_tokens=4000,
-                    temperature=0.7,
+            # Use ThreadPoolExecutor to generate chapters in parallel; the chapter
+            # calls are independent and I/O-bound, so up to batch_size of them
+            # can wait on the provider at the same time
+            if verbose:
+                print(
+                    f"Generating {len(ordered_chapters)} chapters in parallel "
+                    f"(up to {batch_size} at a time)..."
                 )
-            )
 
-            # Format the chapter content
-            # Note: _format_chapter_content is a method of the class, so use self.
-            chapter_content = self._format_chapter_content(
-                chapter_content, chapter_number, chapter_title
-            )
+            with ThreadPoolExecutor(max_workers=batch_size) as executor:
+                # Submit all tasks
+                futures = []
+                for i in range(len(ordered_chapters)):
+                    future = executor.submit(generate_chapter, i)
+                    futures.append(future)
+
+                # Process results as they complete (not in submission order), so the
+                # progress bar tracks finished chapters and errors surface immediately
+                with tqdm(
+                    total=len(futures),
+                    desc="Generating chapters",
+                    unit="chapter",
+                    disable=not verbose,
+                ) as pbar:
+                    for future in as_completed(futures):
+                        chapter = future.result()
+                        chapters.append(chapter)
+                        pbar.update(1)
+
+            # Sort chapters by number
+            chapters.sort(key=lambda x: x["number"])
+
+            # Update the context
+            context["chapters"] = chapters
 
-            # Create the chapter filename
-            chapter_filename = f"chapter_{chapter_number:02d}.md"
+            if verbose:
+                print(f"Generated {len(chapters)} chapters")
 
-            # Save the chapter to a file
-            chapter_path = os.path.join(chapters_dir, chapter_filename)
-            with open(chapter_path, "w", encoding="utf-8") as f:
-                f.write(chapter_content)
+            # No return value needed as context is updated directly
+            return None
 
-            # Print completion message if verbose
-            if verbose:
-                print(f"Generated chapter {chapter_number}: {chapter_title}")
+    def _create_chapter_system_message(
+        self,
+        ordered_chapters: List[str],
+        depth: str,
+        language: str,
+        diagrams: Dict[str, str],
+    ) -> str:
+        """Create the instructions shared by every chapter prompt.
 
-            return {
-                "title": chapter_title,
-                "content": chapter_content,
-                "number": chapter_number,
-                "filename": chapter_filename,
-            }
+        The text only depends on run-wide settings, so it is identical for every
+        chapter. Sending it first, as the system message, gives providers that
+        cache prompt prefixes a stable prefix to reuse across chapters.
 
-        # Use ThreadPoolExecutor to generate chapters in parallel
-        if verbose:
-            print(f"Generating {len(ordered_chapters)} chapters in parallel...")
-
-        with ThreadPoolExecutor(max_workers=batch_size) as executor:
-            # Submit all tasks
-            futures = []
-            for i in range(len(ordered_chapters)):
-                future = executor.submit(generate_chapter, i)
-                futures.append(future)
-
-            # Process results as they complete
-            with tqdm(
-                total=len(futures),
-                desc="Generating chapters",
-                unit="chapter",
-                disable=not verbose,
-            ) as pbar:
-                for future in futures:
-                    chapter = future.result()
-                    chapters.append(chapter)
-                    pbar.update(1)
-
-        # Sort chapters by number
-        chapters.sort(key=lambda x: x["number"])
-
-        # Update the context
-        context["chapters"] = chapters
+        Args:
+            ordered_chapters (list): List of ordered chapter titles
+            depth (str): The depth of the tutorial (basic, intermediate, advanced)
+            language (str): The language for the tutorial
+            diagrams (dict): Dictionary of generated diagrams
 
-        if verbose:
-            print(f"Generated {len(chapters)} chapters")
+        Returns:
+            str: The system message for the LLM
+        """
+        # Build the message from parts joined once at the end
+        parts = [
+            """
+You are an expert software developer and technical writer. Your task is to write one chapter of a multi-chapter tutorial about a codebase.
+
+# Tutorial Chapters
+"""
+        ]
+        parts.extend(
+            f"{number}. {title}\n" for number, title in enumerate(ordered_chapters, 1)
+        )
+
+        parts.append(f"""
+# Tutorial Depth
+The tutorial should be at a {depth} level:
+""")
+
+        # Add depth-specific instructions (intermediate is the default)
+        parts.append(_DEPTH_INSTRUCTIONS.get(depth, _DEPTH_INSTRUCTIONS["intermediate"]))
+
+        # Add language-specific instructions
+        if language != "en":
+            parts.append(f"""
+# Language
+Write the tutorial in {language} language. Ensure that technical terms are correctly translated or kept in English if that's the convention in {language}.
+""")
 
-        # No return value needed as context is updated directly
-        return None
+        # Add diagrams
+        if diagrams:
+            parts.append("""
+# Diagrams
+Include references to the following diagrams where appropriate:
+""")
+            for diagram_type in diagrams:
+                parts.append(f"- {diagram_type.replace('_', ' ').title()}\n")
+
+        # Format the output
+        parts.append(_OUTPUT_FORMAT_INSTRUCTIONS)
+
+        return "".join(parts)
 
     def _create_chapter_prompt(
         self,
@@ -240,20 +419,23 @@ class WriteChaptersNode(Node):
         related_abstractions: List[str],
         repo_dir: str,  # Changed from files dict
         chapter_number: int,
-        depth: str,
-        language: str,
-        diagrams: Dict[str, str],
+        token_counter: TokenCounter,
+        file_contents: Dict[Tuple[str, int], str],
     ) -> str:
-        """Create a prompt for the LLM to generate a chapter.
+        """Create the chapter-specific prompt for the LLM to generate a chapter.
+
+        The shared instructions come from _create_chapter_system_message. File
+        contents are truncated to an even share of CHAPTER_FILE_TOKEN_BUDGET, so
+        the prompt size stays predictable however many files the abstraction has.
 
         Args:
             abstraction (dict): The abstraction to generate a chapter for
             related_abstractions (list): List of related abstraction names
             repo_dir (str): Local path to the cloned repository
             chapter_number (int): The chapter number
-            depth (str): The depth of the tutorial (basic, intermediate, advanced)
-            language (str): The language for the tutorial
-            diagrams (dict): Dictionary of generated diagrams
+            token_counter (TokenCounter): Token counter used to truncate file contents
+            file_contents (dict): Cache of truncated file contents keyed by
+                (file path, token limit), shared across chapters
 
         Returns:
             str: The prompt for the LLM
@@ -263,113 +445,106 @@ class WriteChaptersNode(Node):
         abstraction_description = abstraction.get("description", "")
         abstraction_files = abstraction.get("files", [])
 
-        # Create the prompt
-        prompt = f"""
-You are an expert software developer and technical writer. Your task is to write Chapter {chapter_number} of a tutorial about the {abstraction_name} component.
+        # Build the prompt from parts joined once at the end
+        parts = [
+            f"""
+Write Chapter {chapter_number} of the tutorial, about the {abstraction_name} component.
 
 # Chapter Information
 - Title: {abstraction_name}
 - Description: {abstraction_description}
 - Files: {", ".join(abstraction_files)}
 - Related Components: {", ".join(related_abstractions)}
-
-# Tutorial Depth
-The tutorial should be at a {depth} level:
-"""
-
-        # Add depth-specific instructions
-        if depth == "basic":
-            prompt += """
-- Focus on high-level concepts and simple explanations
-- Avoid complex technical details
-- Use simple code examples
-- Explain concepts in a way that beginners can understand
-"""
-        elif depth == "advanced":
-            prompt += """
-- Include in-depth technical details
-- Explain complex interactions and edge cases
-- Use detailed code examples
-- Assume the reader has a strong technical background
-"""
-        else:  # intermediate (default)
-            prompt += """
-- Balance conceptual explanations with technical details
-- Include relevant code examples
-- Explain important interactions with other components
-- Assume the reader has some programming experience
-"""
-
-        # Add language-specific instructions
-        if language != "en":
-            prompt += f"""
-# Language
-Write the tutorial in {language} language. Ensure that technical terms are correctly translated or kept in English if that's the convention in {language}.
 """
+        ]
 
         # Add file content
-        prompt += """
+        parts.append("""
 # Files
 Here are the contents of the relevant files:
-"""
+""")
+
+        # Split the token budget evenly between the files
+        tokens_per_file = CHAPTER_FILE_TOKEN_BUDGET // max(1, len(abstraction_files))
 
         for file_path in abstraction_files:
-            full_path = os.path.join(repo_dir, file_path)
-            file_content = (
-                f"Content for {file_path} could not be read."  # Default message
-            )
-            try:
-                if os.path.exists(full_path):
-                    with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                        # Read content and truncate
-                        file_content = f.read()[:2000]
-                else:
-                    file_content = f"File {file_path} not found."
-            except Exception as e:
-                file_content = f"Error reading {file_path}: {e}"
+            cache_key = (file_path, tokens_per_file)
+            file_content = file_contents.get(cache_key)
+            if file_content is None:
+                file_content = self._read_file_for_prompt(
+                    repo_dir, file_path, tokens_per_file, token_counter
+                )
+                file_contents[cache_key] = file_content
 
-            prompt += f"""
+            parts.append(f"""
 ## {file_path}
 ```
 {file_content}
 ```
-"""
+""")
 
         # Add related abstractions
         if related_abstractions:
-            prompt += """
+            parts.append("""
 # Related Components
 This component interacts with the following components:
-"""
+""")
 
             for related in related_abstractions:
-                prompt += f"- {related}\n"
+                parts.append(f"- {related}\n")
 
-        # Add diagrams
-        if diagrams:
-            prompt += """
-# Diagrams
-Include references to the following diagrams where appropriate:
-"""
-            for diagram_type, diagram_content in diagrams.items():
-                prompt += f"- {diagram_type.replace('_', ' ').title()}\n"
+        return "".join(parts)
 
-        # Format the output
-        prompt += """
-# Output Format
-Write a comprehensive tutorial chapter in Markdown format. Include:
-1. A clear heading with the chapter number and title
-2. An introduction explaining the purpose and importance of this component
-3. Detailed explanations of how the component works
-4. Code examples with explanations
-5. Interactions with other components
-6. Best practices and common patterns
-7. A summary of key points
+    def _read_file_for_prompt(
+        self,
+        repo_dir: str,
+        file_path: str,
+        max_tokens: int,
+        token_counter: TokenCounter,
+    ) -> str:
+        """Read a repository file, truncated to a token limit, for a chapter prompt.
 
-Make the tutorial engaging, clear, and informative. Use proper Markdown formatting for headings, code blocks, lists, etc.
-"""
+        Args:
+            repo_dir (str): Local path to the cloned repository
+            file_path (str): Relative path of the file
+            max_tokens (int): Maximum number of tokens to keep
+            token_counter (TokenCounter): Token counter used to truncate the content
+
+        Returns:
+            str: The truncated file content, or a message if it could not be read
+        """
+        full_path = os.path.join(repo_dir, file_path)
+        try:
+            if not os.path.exists(full_path):
+                return f"File {file_path} not found."
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                # Read content (bounded, so huge files are never fully
+                # tokenized) and truncate it to the file's token share
+                return self._truncate_to_tokens(
+                    f.read(max_tokens * 8), max_tokens, token_counter
+                )
+        except Exception as e:
+            return f"Error reading {file_path}: {e}"
+
+    def _truncate_to_tokens(
+        self, text: str, max_tokens: int, token_counter: TokenCounter
+    ) -> str:
+        """Truncate text to at most the given number of tokens.
 
-        return prompt
+        Args:
+            text (str): The text to truncate
+            max_tokens (int): Maximum number of tokens to keep
+            token_counter (TokenCounter): Token counter providing the encoder
+
+        Returns:
+            str: The text, truncated with a marker if it was too long
+        """
+        # Special-token text (e.g. "<|endoftext|>" in tokenizer code) is plain
+        # file content here, so encode it as ordinary text instead of raising
+        tokens = token_counter.encoder.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return token_counter.encoder.decode(tokens[:max_tokens]) + "\n... [truncated]"
 
     def _format_chapter_content(
         self, content: str, chapter_number: int, chapter_title: str
@@ -3,4 +3,5 @@ Constants used across the CodeTutorAI application.
 """
 
 DEFAULT_OUTPUT_DIR = "tutorial_output"
-DEFAULT_CACHE_DIR = ".llm_cache"
\ No newline at end of file
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_BATCH_SIZE = 4  # Chapters generated in parallel
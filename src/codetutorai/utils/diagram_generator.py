@@ -4,71 +4,228 @@ CodeTutorAI - Diagram Generator
 This module provides functions for generating Mermaid diagrams from code.
 """
 
+import ast
+import hashlib
 import os
 import re
-from typing import Any, Dict, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 from .formatting import sanitize_mermaid_label # Added import
 
+# Regular expressions for class, method and import definitions, compiled once
+# (used for files that cannot be parsed as Python)
+_CLASS_RE = re.compile(r"class\s+(\w+)(?:\(([^)]*)\))?\s*:")
+_METHOD_RE = re.compile(r"def\s+(\w+)\s*\(self(?:,\s*[^)]*)?(?:\)\s*->.*?:|\):)")
+_IMPORT_RE = re.compile(r"from\s+([\w.]+)\s+import\s+([^#\n]+)")
 
-def extract_classes(repo_dir: str, file_paths: List[str]) -> Dict[str, Dict]:
-    """Extract class definitions from Python files.
+# Diagrams used when there is nothing to draw
+_EMPTY_CLASS_DIAGRAM = "```mermaid\nclassDiagram\n    %% No Python classes found\n```"
+_EMPTY_COMPONENT_DIAGRAM = "```mermaid\nflowchart TD\n    %% No Python components found\n```"
+
+# Number of threads reading files for the diagrams
+DIAGRAM_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# In-memory LRU of generated diagrams, keyed by the paths and contents of the
+# files (_get_diagrams_cache_key). Each run re-clones the repository, so this
+# matches a regenerated tutorial for an unchanged repository in the same
+# process (e.g. the Streamlit app) and skips parsing and diagram generation.
+MAX_CACHED_DIAGRAMS = 32
+_diagrams_cache: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+_diagrams_cache_lock = threading.Lock()
+
+
+def read_python_files(repo_dir: str, file_paths: List[str]) -> Dict[str, str]:
+    """Read the Python files to analyze, once for all the extractors.
+
+    The files are read in a thread pool, so the reads overlap.
 
     Args:
         repo_dir (str): The local path to the cloned repository.
-        file_paths (list): List of relative file paths to analyze.
+        file_paths (list): List of relative file paths.
 
     Returns:
-        dict: Dictionary mapping class names to class information
+        dict: Dictionary mapping relative paths of the readable Python files
+            to their content, in file order
     """
-    classes = {}
-
-    # Regular expression for class definition
-    class_pattern = r"class\s+(\w+)(?:\(([^)]*)\))?\s*:"
-    method_pattern = r"def\s+(\w+)\s*\(self(?:,\s*[^)]*)?(?:\)\s*->.*?:|\):)"
 
-    for rel_path in file_paths:
-        if not rel_path.endswith(".py"):
-            continue
-
-        full_path = os.path.join(repo_dir, rel_path)
+    def read_file(rel_path):
         try:
-            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
+            with open(os.path.join(repo_dir, rel_path), "rb") as f:
+                raw = f.read()
         except Exception:
             # Ignore files that cannot be read
+            return None
+        try:
+            # "utf-8-sig" also drops a leading byte order mark, which ast.parse rejects
+            return raw.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            # Latin-1 maps every byte to a character, so nothing is silently
+            # dropped from files in legacy encodings
+            return raw.decode("latin-1")
+
+    python_paths = [rel_path for rel_path in file_paths if rel_path.endswith(".py")]
+    with ThreadPoolExecutor(max_workers=DIAGRAM_MAX_WORKERS) as executor:
+        file_contents = list(executor.map(read_file, python_paths))
+
+    return {
+        rel_path: content
+        for rel_path, content in zip(python_paths, file_contents)
+        if content is not None
+    }
+
+
+def parse_python_files(contents: Dict[str, str]) -> Dict[str, Optional[ast.Module]]:
+    """Parse the Python files once for all the extractors.
+
+    Args:
+        contents (dict): Dictionary mapping relative file paths to file
+            contents, from read_python_files.
+
+    Returns:
+        dict: Dictionary mapping relative file paths to their syntax trees,
+            or None for files that cannot be parsed
+    """
+    trees = {}
+    for rel_path, content in contents.items():
+        try:
+            trees[rel_path] = ast.parse(content, filename=rel_path)
+        except (SyntaxError, ValueError, RecursionError):
+            # The extractors fall back to the regex scans for this file
+            trees[rel_path] = None
+    return trees
+
+
+def _ast_file_classes(rel_path: str, tree: ast.Module) -> Dict[str, Dict]:
+    """Extract class definitions from the syntax tree of a single Python file.
+
+    Unlike the regex scan, this finds decorated and nested classes, async
+    methods and methods with multi-line signatures.
+
+    Args:
+        rel_path (str): Relative path of the file.
+        tree (ast.Module): Syntax tree of the file.
+
+    Returns:
+        dict: Dictionary mapping class names to class information
+    """
+    classes = {}
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef):
             continue
 
-        # Find all class definitions in the file
-        for class_match in re.finditer(class_pattern, content):
-            class_name = class_match.group(1)
-            parent_classes = class_match.group(2)
-
-            # Extract parent classes
-            parents = []
-            if parent_classes:
-                parents = [p.strip() for p in parent_classes.split(",")]
-
-            # Find the class body
-            class_start = class_match.end()
-            class_body = content[class_start:]
-
-            # Extract methods
-            methods = []
-            for method_match in re.finditer(method_pattern, class_body):
-                method_name = method_match.group(1)
-                if not method_name.startswith("_") or method_name in [
-                    "__init__",
-                    "__call__",
-                ]:
-                    methods.append(method_name)
-
-            # Store class information
-            classes[class_name] = {
-                "file": rel_path, # Store relative path
-                "parents": parents,
-                "methods": methods,
-            }
+        # Store class information
+        classes[node.name] = {
+            "file": rel_path, # Store relative path
+            "parents": [ast.unparse(base) for base in node.bases],
+            # Deduplicated in order, so redefined methods (e.g. property
+            # setters or conditional definitions) are only listed once
+            "methods": list(
+                dict.fromkeys(
+                    item.name
+                    for item in node.body
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                    and (not item.name.startswith("_") or item.name in ("__init__", "__call__"))
+                )
+            ),
+        }
+
+    return classes
+
+
+def _regex_file_classes(rel_path: str, content: str) -> Dict[str, Dict]:
+    """Extract class definitions from a single Python file with regular expressions.
+
+    Args:
+        rel_path (str): Relative path of the file.
+        content (str): Content of the file.
+
+    Returns:
+        dict: Dictionary mapping class names to class information
+    """
+    classes = {}
+
+    # Skip the regex scans for files that cannot contain a class definition
+    if "class" not in content:
+        return classes
+
+    # Methods can only be found after a "def" in the file
+    has_methods = "def" in content
+
+    # Find all class definitions in the file
+    class_matches = list(_CLASS_RE.finditer(content))
+    for i, class_match in enumerate(class_matches):
+        class_name = class_match.group(1)
+        parent_classes = class_match.group(2)
+
+        # Extract parent classes
+        parents = []
+        if parent_classes:
+            parents = [p.strip() for p in parent_classes.split(",")]
+
+        # Find the class body: it ends where the next class starts, so each
+        # method is attributed to its own class and the file is scanned once
+        # (bounded by position, without copying the body)
+        class_start = class_match.end()
+        class_end = (
+            class_matches[i + 1].start()
+            if i + 1 < len(class_matches)
+            else len(content)
+        )
+
+        # Extract methods (a dict, so each name is kept once, in order)
+        methods = {}
+        method_matches = (
+            _METHOD_RE.finditer(content, class_start, class_end)
+            if has_methods
+            else ()
+        )
+        for method_match in method_matches:
+            method_name = method_match.group(1)
+            if not method_name.startswith("_") or method_name in [
+                "__init__",
+                "__call__",
+            ]:
+                methods[method_name] = None
+
+        # Store class information
+        classes[class_name] = {
+            "file": rel_path, # Store relative path
+            "parents": parents,
+            "methods": list(methods),
+        }
+
+    return classes
+
+
+def extract_classes(
+    contents: Dict[str, str], trees: Optional[Dict[str, Optional[ast.Module]]] = None
+) -> Dict[str, Dict]:
+    """Extract class definitions from Python files.
+
+    Args:
+        contents (dict): Dictionary mapping relative file paths to file
+            contents, from read_python_files.
+        trees (dict, optional): Syntax trees of the files, from
+            parse_python_files (parsed here if not given).
+
+    Returns:
+        dict: Dictionary mapping class names to class information
+    """
+    if trees is None:
+        trees = parse_python_files(contents)
+
+    classes = {}
+
+    for rel_path, content in contents.items():
+        tree = trees.get(rel_path)
+        if tree is not None:
+            classes.update(_ast_file_classes(rel_path, tree))
+        else:
+            classes.update(_regex_file_classes(rel_path, content))
 
     return classes
 
@@ -82,25 +239,34 @@ def generate_class_diagram(classes: Dict[str, Dict]) -> str:
     Returns:
         str: Mermaid class diagram
     """
+    if not classes:
+        return _EMPTY_CLASS_DIAGRAM
+
     diagram = ["```mermaid", "classDiagram"]
 
     # Pass 1: Define all class blocks and their methods
     defined_classes = {} # Map original name to sanitized name for valid classes
+    defined_names = set() # Sanitized names already defined, for O(1) duplicate checks
     for class_name, info in classes.items():
         sanitized_class_name = sanitize_mermaid_label(class_name)
         # Ensure the sanitized name is valid and unique before defining the block
-        if sanitized_class_name and sanitized_class_name not in defined_classes.values():
+        if sanitized_class_name and sanitized_class_name not in defined_names:
             defined_classes[class_name] = sanitized_class_name
-            diagram.append(f"    class {sanitized_class_name} {{")
-            for method in info["methods"]:
-                sanitized_method_name = sanitize_mermaid_label(method)
-                if sanitized_method_name: # Ensure method name is valid
-                    # Remove explicit '+' for public methods, simplifying syntax
-                    diagram.append(f"        {sanitized_method_name}()")
-            diagram.append("    }")
+            defined_names.add(sanitized_class_name)
+            # Build the whole class block at once; methods with an invalid
+            # sanitized name are skipped, and no explicit '+' is added for public
+            # methods, simplifying syntax
+            method_lines = [
+                "        " + sanitized_method_name + "()"
+                for sanitized_method_name in map(sanitize_mermaid_label, info["methods"])
+                if sanitized_method_name
+            ]
+            diagram.append(
+                "\n".join([f"    class {sanitized_class_name} {{", *method_lines, "    }"])
+            )
         elif not sanitized_class_name:
              print(f"Warning: Skipping class '{class_name}' due to invalid sanitized name.") # Optional: Add logging/warning
-        # If sanitized_class_name is already in defined_classes.values(), it's a duplicate after sanitization, skip block definition
+        # If sanitized_class_name is already in defined_names, it's a duplicate after sanitization, skip block definition
 
 
     # Pass 2: Define all inheritance relationships, avoiding duplicates
@@ -122,60 +288,89 @@ def generate_class_diagram(classes: Dict[str, Dict]) -> str:
     return "\n".join(diagram)
 
 
-def extract_components(repo_dir: str, file_paths: List[str]) -> Dict[str, Dict]:
-    """Extract component definitions from Python files.
+def _ast_file_imports(tree: ast.Module) -> List[Tuple[str, str]]:
+    """Extract the import statements from the syntax tree of a single Python file.
 
     Args:
-        repo_dir (str): The local path to the cloned repository.
-        file_paths (list): List of relative file paths to analyze.
+        tree (ast.Module): Syntax tree of the file.
 
     Returns:
-        dict: Dictionary mapping component names to component information
+        list: List of (module, imported item) tuples
     """
-    components = {}
-    imports = {}
+    file_imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom):
+            # Keep the leading dots of relative imports, as the regex scan does
+            module = "." * node.level + (node.module or "")
+            file_imports.extend((module, alias.name) for alias in node.names)
+        elif isinstance(node, ast.Import):
+            file_imports.extend((alias.name, alias.name) for alias in node.names)
+    return file_imports
 
-    # Regular expression for import statements
-    import_pattern = r"from\s+([\w.]+)\s+import\s+([^#\n]+)"
 
-    for rel_path in file_paths:
-        if not rel_path.endswith(".py"):
-            continue
+def _regex_file_imports(content: str) -> List[Tuple[str, str]]:
+    """Extract the "from ... import ..." statements from a single Python file
+    with regular expressions.
 
-        full_path = os.path.join(repo_dir, rel_path)
-        try:
-            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-        except Exception:
-            # Ignore files that cannot be read
-            continue
+    Args:
+        content (str): Content of the file.
 
-        # Extract the module name from the file path
-        module_name = rel_path.replace(os.sep, ".").replace(".py", "")
-        if module_name.startswith("."):
-            module_name = module_name[1:]
+    Returns:
+        list: List of (module, imported item) tuples
+    """
+    # Find all import statements in the file
+    file_imports = []
+    # Only scan files that contain a "from ... import" at all
+    import_matches = _IMPORT_RE.finditer(content) if "from" in content else ()
+    for import_match in import_matches:
+        module = import_match.group(1)
+        imported = import_match.group(2)
+        imported_items = [item.strip() for item in imported.split(",")]
+        file_imports.extend([(module, item) for item in imported_items])
+
+    return file_imports
+
+
+def extract_components(
+    contents: Dict[str, str], trees: Optional[Dict[str, Optional[ast.Module]]] = None
+) -> Dict[str, Dict]:
+    """Extract component definitions from Python files.
+
+    Args:
+        contents (dict): Dictionary mapping relative file paths to file
+            contents, from read_python_files.
+        trees (dict, optional): Syntax trees of the files, from
+            parse_python_files (parsed here if not given).
+
+    Returns:
+        dict: Dictionary mapping component names to component information
+    """
+    if trees is None:
+        trees = parse_python_files(contents)
+
+    components = {}
+
+    for rel_path, content in contents.items():
+        tree = trees.get(rel_path)
+        if tree is not None:
+            file_imports = _ast_file_imports(tree)
+        else:
+            file_imports = _regex_file_imports(content)
 
-        # Find all import statements in the file
-        file_imports = []
-        for import_match in re.finditer(import_pattern, content):
-            module = import_match.group(1)
-            imported = import_match.group(2)
-            imported_items = [item.strip() for item in imported.split(",")]
-            file_imports.extend([(module, item) for item in imported_items])
+        # Extract the module name from the file path (only the final extension
+        # is dropped, so paths with ".py" elsewhere are kept intact)
+        base, _ = os.path.splitext(rel_path)
+        module_name = base.replace(os.sep, ".").lstrip(".")
 
         # Store component information
         components[module_name] = {"file": rel_path, "imports": file_imports}
 
-        # Store imports for dependency resolution
-        imports[module_name] = file_imports
-
-    # Resolve dependencies
-    for component, info in components.items():
-        dependencies = set()
-        for module, item in info["imports"]:
-            if module in components:
-                dependencies.add(module)
-        components[component]["dependencies"] = list(dependencies)
+    # Resolve dependencies in one pass over each component's imports (sorted,
+    # so the diagram edges come out in a deterministic order)
+    for info in components.values():
+        info["dependencies"] = sorted(
+            {module for module, _ in info["imports"] if module in components}
+        )
 
     return components
 
@@ -189,20 +384,23 @@ def generate_component_diagram(components: Dict[str, Dict]) -> str:
     Returns:
         str: Mermaid component diagram
     """
+    if not components:
+        return _EMPTY_COMPONENT_DIAGRAM
+
     diagram = ["```mermaid", "flowchart TD"]
 
     # Add component definitions
-    component_ids = {} # Map original name to sanitized ID
+    component_ids = {} # Map original name to sanitized ID, for valid nodes only
     processed_ids = set() # Track processed sanitized IDs
 
-    for component_name in components.keys():
-        # Simplify component name for display and sanitize it for use as ID
-        display_name = component_name.split(".")[-1]
+    for component_name in components:
+        # Simplify component name for display (rpartition avoids building a
+        # list of all the parts) and sanitize it for use as ID
+        display_name = component_name.rpartition(".")[2]
         sanitized_id = sanitize_mermaid_label(display_name)
         if not sanitized_id or sanitized_id in processed_ids:
-            # Handle empty or duplicate sanitized IDs (e.g., skip or generate unique)
-            # For now, we map the original name but might skip adding the node if ID conflicts
-            component_ids[component_name] = None # Mark as problematic
+            # Skip empty or duplicate sanitized IDs; components left out of
+            # component_ids are skipped when adding the dependencies too
             continue
         component_ids[component_name] = sanitized_id
         processed_ids.add(sanitized_id)
@@ -212,18 +410,37 @@ def generate_component_diagram(components: Dict[str, Dict]) -> str:
     # Add dependencies using sanitized IDs
     for component_name, info in components.items():
         source_id = component_ids.get(component_name)
-        if not source_id: # Skip if source node was problematic
+        if source_id is None: # Skip if source node was problematic
             continue
 
         for dependency in info.get("dependencies", []):
             target_id = component_ids.get(dependency)
-            if target_id: # Ensure target node exists and is valid
+            if target_id is not None: # Ensure target node exists and is valid
                 diagram.append(f"    {target_id} --> {source_id}") # Arrow from dependency to component
 
     diagram.append("```")
     return "\n".join(diagram)
 
 
+def _get_diagrams_cache_key(contents: Dict[str, str]) -> str:
+    """Compute a cache key for the diagrams generated from the given files.
+
+    The key covers each file's path and content, so it matches a fresh clone of
+    an unchanged repository and any edit invalidates the cached diagrams.
+
+    Args:
+        contents (dict): Dictionary mapping relative file paths to file contents.
+
+    Returns:
+        str: The cache key
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for rel_path, content in contents.items():
+        hasher.update(f"\0{rel_path}\0{len(content)}\0".encode("utf-8"))
+        hasher.update(content.encode("utf-8"))
+    return hasher.hexdigest()
+
+
 def generate_diagrams(repo_dir: str, abstractions: List[Dict[str, Any]], verbose: bool = False) -> Dict[str, str]:
     """Generate Mermaid diagrams from code.
 
@@ -235,29 +452,51 @@ def generate_diagrams(repo_dir: str, abstractions: List[Dict[str, Any]], verbose
     Returns:
         dict: Dictionary mapping diagram types to diagram content
     """
-    # Extract all unique Python file paths from abstractions
-    python_files = set()
+    # Extract all unique Python file paths from abstractions, in the order they
+    # appear (a dict rather than a set, so the diagrams are deterministic)
+    python_files = {}
     for abstraction in abstractions:
         for file_path in abstraction.get("files", []):
             if file_path.endswith(".py"):
-                python_files.add(file_path)
+                python_files[file_path] = None
 
     if verbose:
         print(f"Generating diagrams based on {len(python_files)} Python files.")
 
     if not python_files:
         return {
-            "class_diagram": "```mermaid\nclassDiagram\n    %% No Python classes found\n```",
-            "component_diagram": "```mermaid\nflowchart TD\n    %% No Python components found\n```",
+            "class_diagram": _EMPTY_CLASS_DIAGRAM,
+            "component_diagram": _EMPTY_COMPONENT_DIAGRAM,
         }
 
-    python_file_list = list(python_files)
-    classes = extract_classes(repo_dir, python_file_list)
-    components = extract_components(repo_dir, python_file_list)
+    # Read each file once for the cache key and both extractors
+    contents = read_python_files(repo_dir, list(python_files))
+
+    # Reuse the diagrams from an earlier call over the same file contents
+    cache_key = _get_diagrams_cache_key(contents)
+    with _diagrams_cache_lock:
+        cached_diagrams = _diagrams_cache.get(cache_key)
+        if cached_diagrams is not None:
+            _diagrams_cache.move_to_end(cache_key)
+    if cached_diagrams is not None:
+        if verbose:
+            print("Reusing diagrams generated earlier for the same files.")
+        return dict(cached_diagrams)
+
+    # Parse each file once for both extractors
+    trees = parse_python_files(contents)
+    classes = extract_classes(contents, trees)
+    components = extract_components(contents, trees)
 
     diagrams = {
         "class_diagram": generate_class_diagram(classes),
         "component_diagram": generate_component_diagram(components),
     }
 
+    with _diagrams_cache_lock:
+        _diagrams_cache[cache_key] = dict(diagrams)
+        _diagrams_cache.move_to_end(cache_key)
+        if len(_diagrams_cache) > MAX_CACHED_DIAGRAMS:
+            _diagrams_cache.popitem(last=False)
+
     return diagrams
@@ -4,9 +4,18 @@ CodeTutorAI - Formatting Utilities
 This module provides utilities for formatting text and code.
 """
 
+import functools
 import re
 from typing import Any, Dict, List, Optional
 
+# Regular expressions used by the helpers below, compiled once
+# Captures username and repo name from various GitHub URL formats,
+# handling an optional .git suffix and trailing slashes
+_GITHUB_URL_RE = re.compile(r"^(?:https?://|git@)github\.com[:/]([^/]+)/([^/.]+)(?:\.git)?/?$")
+# Basic GitHub repo URL structure
+_GITHUB_REPO_URL_RE = re.compile(r"^https://github\.com/[^/]+/[^/]+/?$")
+# Sequences of non-alphanumeric (excluding underscore) characters
+_NON_WORD_RE = re.compile(r"[^\w]+")
 
 
 def format_code_block(code: str, language: str = "") -> str:
@@ -199,11 +208,7 @@ def get_repo_info_from_url(url: str) -> Optional[Dict[str, str]]:
     """
     if not url:
         return None
-    # Regex to capture username and repo name from various GitHub URL formats
-    # Handles optional .git suffix and trailing slashes
-    match = re.match(
-        r"^(?:https?://|git@)github\.com[:/]([^/]+)/([^/.]+)(?:\.git)?/?$", url
-    )
+    match = _GITHUB_URL_RE.match(url)
     if match:
         username = match.group(1)
         repo_name = match.group(2)
@@ -216,9 +221,7 @@ def is_valid_github_url(url: str) -> bool:
     if not url:
         return False
     # Basic check for GitHub repo URL structure
-    pattern = r"^https://github\.com/[^/]+/[^/]+/?$"
-    # Ensure re is imported (it should be at the top of the file)
-    return bool(re.match(pattern, url))
+    return bool(_GITHUB_REPO_URL_RE.match(url))
 
 
 def format_duration(seconds: float) -> str:
@@ -240,24 +243,25 @@ def format_duration(seconds: float) -> str:
         parts.append(f"{secs}s")
 
     return " ".join(parts)
-# Common Mermaid keywords (add more if needed)
-MERMAID_KEYWORDS = {
-    "graph", "subgraph", "end", "classDiagram", "stateDiagram", "sequenceDiagram",
+# Common Mermaid keywords, lowercased for the case-insensitive check in
+# sanitize_mermaid_label (add more if needed). Only word tokens are listed:
+# arrows and other punctuation can never survive sanitization.
+MERMAID_KEYWORDS = frozenset({
+    "graph", "subgraph", "end", "classdiagram", "statediagram", "sequencediagram",
     "gantt", "pie", "flowchart", "class", "state", "style", "link", "click",
-    "direction", "TB", "BT", "RL", "LR", "TD", "participant", "actor", "note",
+    "direction", "tb", "bt", "rl", "lr", "td", "participant", "actor", "note",
     "loop", "alt", "opt", "par", "critical", "break", "rect", "circle", "ellipse",
-    "diamond", "hexagon", "roundrect", "label", "arrowhead", "arrowtail",
-    "line", "stroke", "fill", "color", "font", "align", "width", "height",
-    "margin", "padding", "border", "background", "foreground", "text", "title",
-    "section", "dateFormat", "axisFormat", "tickInterval", "excludes", "includes",
-    "todayMarker", "theme", "securityLevel", "startOnLoad", "htmlLabels",
-    "nodeSpacing", "rankSpacing", "curve", "stepBefore", "stepAfter", "basis",
-    "linear", "cardinal", "catmullRom", "monotoneX", "monotoneY", "natural",
-    "%%", "---", "-->", "--", "->", "-.", "-.->", "==>", "==", "<--", "<-", "<->",
-    "<-->", "o--", "--o", "x--", "--x", "<<--", "-->>", "o->", "<-o", "x->", "<-x",
-    "..>", "<..", "..", ".."
-}
-
+    "diamond", "hexagon", "roundrect", "label", "arrowhead", "arrowtail", "line",
+    "stroke", "fill", "color", "font", "align", "width", "height", "margin",
+    "padding", "border", "background", "foreground", "text", "title", "section",
+    "dateformat", "axisformat", "tickinterval", "excludes", "includes",
+    "todaymarker", "theme", "securitylevel", "startonload", "htmllabels",
+    "nodespacing", "rankspacing", "curve", "stepbefore", "stepafter", "basis",
+    "linear", "cardinal", "catmullrom", "monotonex", "monotoney", "natural",
+})
+
+# Memoized: the same class, method and module names recur across a diagram
+@functools.lru_cache(maxsize=8192)
 def sanitize_mermaid_label(label: str) -> str:
     """Removes or replaces potentially problematic characters for Mermaid IDs/labels.
 
@@ -273,7 +277,7 @@ def sanitize_mermaid_label(label: str) -> str:
     original_label = label # Keep original for start/end underscore check
 
     # Replace sequences of non-alphanumeric (excluding underscore) with a single underscore
-    sanitized = re.sub(r'[^\w]+', '_', label)
+    sanitized = _NON_WORD_RE.sub('_', label)
 
     # Remove leading/trailing underscores unless the original label had them
     if not original_label.startswith('_') and sanitized.startswith('_'):
@@ -6,63 +6,105 @@ import datetime
 import json
 import logging
 import os
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 # Import the validation function
 from .formatting import is_valid_github_url
+from .json_utils import dumps_json, loads_json
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_HISTORY_FILENAME = "generation_history.json"
+DEFAULT_HISTORY_FILENAME = "generation_history.jsonl"
+# Histories were stored as a single JSON list before switching to JSON Lines
+LEGACY_HISTORY_FILENAME = "generation_history.json"
+
+# Unique GitHub URLs per history file, keyed by the file's mtime and size so a
+# saved run invalidates the entry. The UI reloads the URL list on every rerun.
+_URL_CACHE: Dict[Path, Tuple[Tuple[int, int], List[str]]] = {}
+_url_cache_lock = threading.Lock()
+
+
+def migrate_legacy_history(legacy_file_path: Path, history_file_path: Path) -> bool:
+    """
+    Converts a legacy JSON list history file to the JSON Lines format.
+
+    The converted history is written to a temporary file and swapped in, and the
+    legacy file is removed once the conversion succeeds.
+
+    Args:
+        legacy_file_path (Path): Path to the legacy JSON file holding a list of entries.
+        history_file_path (Path): Path to the JSON Lines file to create.
+
+    Returns:
+        bool: True if the legacy history was migrated, False otherwise.
+    """
+    if not legacy_file_path.is_file():
+        return False
+
+    try:
+        with open(legacy_file_path, "r", encoding="utf-8") as f:
+            history = loads_json(f.read())
+    except (IOError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not read legacy history {legacy_file_path}: {e}")
+        return False
+
+    if not isinstance(history, list):
+        logger.warning(
+            f"Legacy history file {legacy_file_path} does not contain a list. Skipping migration."
+        )
+        return False
+
+    try:
+        tmp_path = history_file_path.with_name(history_file_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(dumps_json(entry) + "\n" for entry in history))
+        os.replace(tmp_path, history_file_path)
+        legacy_file_path.unlink()
+    except IOError as e:
+        logger.error(f"Error migrating legacy history {legacy_file_path}: {e}")
+        return False
+
+    logger.info(
+        f"Migrated {len(history)} history entries from {legacy_file_path} to {history_file_path}"
+    )
+    return True
+
+
+def _migrate_if_needed(history_file_path: Path) -> None:
+    """Migrates the legacy JSON sibling of a missing JSON Lines history file."""
+    if history_file_path.suffix == ".jsonl" and not history_file_path.exists():
+        migrate_legacy_history(history_file_path.with_suffix(".json"), history_file_path)
 
 
 def save_generation_metadata(metadata: Dict[str, Any], history_file_path: Path) -> None:
     """
-    Loads existing generation history, appends new metadata, and saves it back.
+    Appends the metadata of a generation run to the history file.
+
+    The history is stored as JSON Lines, so saving appends a single line instead
+    of rewriting the whole history.
 
     Args:
         metadata (Dict[str, Any]): Dictionary containing metadata for the current run.
                                     Should include keys like 'timestamp', 'repo_url',
                                     'output_path', and relevant config settings.
-        history_file_path (Path): Path to the JSON file storing the history.
+        history_file_path (Path): Path to the JSON Lines file storing the history.
     """
-    history: List[Dict[str, Any]] = []
-
     # Ensure timestamp is present
     if "timestamp" not in metadata:
         metadata["timestamp"] = datetime.datetime.now().isoformat()
 
     try:
-        # Load existing history if the file exists
-        if history_file_path.exists() and history_file_path.is_file():
-            with open(history_file_path, "r") as f:
-                try:
-                    history = json.load(f)
-                    if not isinstance(history, list):
-                        logger.warning(
-                            f"History file {history_file_path} does not contain a list. Resetting history."
-                        )
-                        history = []
-                except json.JSONDecodeError:
-                    logger.warning(
-                        f"Could not decode JSON from {history_file_path}. Starting new history."
-                    )
-                    history = []
-        else:
-            logger.info(
-                f"History file {history_file_path} not found. Creating new history."
-            )
-
-        # Append new metadata
-        history.append(metadata)
-
         # Ensure the directory exists before writing
         history_file_path.parent.mkdir(parents=True, exist_ok=True)
+        _migrate_if_needed(history_file_path)
 
-        # Save updated history
-        with open(history_file_path, "w") as f:
-            json.dump(history, f, indent=4)  # Use indent for readability
+        # Append the entry as one line in a single write. Files opened for
+        # appending are written at the end by the OS, so concurrent runs never
+        # overwrite each other's entries.
+        with open(history_file_path, "a", encoding="utf-8") as f:
+            f.write(dumps_json(metadata) + "\n")
 
         logger.info(f"Successfully saved generation metadata to {history_file_path}")
 
@@ -72,29 +114,36 @@ def save_generation_metadata(metadata: Dict[str, Any], history_file_path: Path)
         logger.error(f"An unexpected error occurred while saving metadata: {e}")
 
 
-# Potential future function:
-# def load_generation_history(history_file_path: Path) -> List[Dict[str, Any]]:
-#     """Loads the generation history from the specified file."""
-#     # ... implementation ...
 # --- History Loading Functions ---
 
 def load_generation_history(history_file_path: Path) -> List[Dict[str, Any]]:
-    """Loads the generation history list from the specified JSON file."""
+    """Loads the generation history list from the specified JSON Lines file."""
+    _migrate_if_needed(history_file_path)
+
     if history_file_path.exists() and history_file_path.is_file():
+        history: List[Dict[str, Any]] = []
         try:
-            with open(history_file_path, "r") as f:
-                history = json.load(f)
-                if isinstance(history, list):
-                    return history
-                else:
-                    logger.warning(f"History file {history_file_path} does not contain a list. Returning empty history.")
-                    return []
-        except json.JSONDecodeError:
-            logger.warning(f"Could not decode JSON from {history_file_path}. Returning empty history.")
-            return []
+            with open(history_file_path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = loads_json(line)
+                    except json.JSONDecodeError:
+                        logger.warning(
+                            f"Could not decode line {line_number} of {history_file_path}. Skipping it."
+                        )
+                        continue
+                    if isinstance(entry, dict):
+                        history.append(entry)
+                    else:
+                        logger.warning(
+                            f"Line {line_number} of {history_file_path} is not an object. Skipping it."
+                        )
         except IOError as e:
             logger.error(f"Error reading history file {history_file_path}: {e}")
             return []
+        return history
     else:
         logger.info(f"History file {history_file_path} not found. Returning empty history.")
         return []
@@ -104,12 +153,43 @@ def load_github_url_history(history_file_path: Path) -> List[str]:
     """
     Loads generation history and extracts a list of unique, valid GitHub URLs.
 
+    The result is cached per history file and reused until the file changes.
+
     Args:
-        history_file_path (Path): Path to the JSON file storing the history.
+        history_file_path (Path): Path to the JSON Lines file storing the history.
 
     Returns:
         List[str]: A list of unique, valid GitHub repository URLs found in the history.
     """
+    _migrate_if_needed(history_file_path)
+    try:
+        stat = history_file_path.stat()
+    except OSError:
+        return _collect_github_urls(history_file_path)
+
+    cache_key = history_file_path.resolve()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _url_cache_lock:
+        cached = _URL_CACHE.get(cache_key)
+    if cached is not None and cached[0] == signature:
+        return list(cached[1])
+
+    urls = _collect_github_urls(history_file_path)
+    with _url_cache_lock:
+        _URL_CACHE[cache_key] = (signature, urls)
+    return list(urls)
+
+
+def _collect_github_urls(history_file_path: Path) -> List[str]:
+    """
+    Extracts the unique, valid GitHub URLs from the history without caching.
+
+    Args:
+        history_file_path (Path): Path to the JSON Lines file storing the history.
+
+    Returns:
+        List[str]: A sorted list of unique, valid GitHub repository URLs.
+    """
     history = load_generation_history(history_file_path)
     unique_urls = set()
 
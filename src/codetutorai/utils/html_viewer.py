@@ -4,7 +4,6 @@ CodeTutorAI - HTML Viewer
 This module provides functions for creating a browser-based viewer for tutorials.
 """
 
-import json
 import os
 import shutil
 import webbrowser
@@ -12,6 +11,8 @@ from typing import Any, Dict, List, Optional
 
 from tqdm import tqdm
 
+from codetutorai.utils.json_utils import dumps_json
+
 
 def create_html_viewer(
     output_dir: str,
@@ -61,9 +62,9 @@ def create_html_viewer(
     # Create the JavaScript file with chapter and diagram contents
     js_content = (
         _get_js()
-        .replace("${chapter_contents_str}", json.dumps(chapter_contents_json))
+        .replace("${chapter_contents_str}", dumps_json(chapter_contents_json))
         .replace(  # Add replacement for diagram contents
-            "${diagram_contents_str}", json.dumps(diagram_contents_json)
+            "${diagram_contents_str}", dumps_json(diagram_contents_json)
         )
     )
     js_path = os.path.join(assets_dir, "script.js")
@@ -166,7 +167,7 @@ def _get_html(
         toc_html = "<li>No chapters available</li>"
 
     # Convert chapter contents to JSON
-    chapter_contents_str = json.dumps(chapter_contents_json)
+    chapter_contents_str = dumps_json(chapter_contents_json)
 
     # Create the diagrams section in the TOC if available
     diagrams_toc_html = ""
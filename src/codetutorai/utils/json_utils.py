@@ -0,0 +1,166 @@
+"""
+CodeTutorAI - JSON Utilities
+
+This module provides helpers for encoding and decoding JSON, including JSON
+embedded in LLM responses. orjson is used when it is installed, with the
+standard library as the fallback, and json-repair (if installed) is used to
+recover malformed arrays in LLM responses.
+"""
+
+import json
+import re
+from typing import Any, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+try:
+    from json_repair import repair_json
+except ImportError:  # json-repair is optional
+    repair_json = None
+
+_DECODER = json.JSONDecoder()
+
+# Contents of a fenced code block, e.g. ```json ... ```
+_FENCE_RE = re.compile(r"```[\w-]*[^\S\n]*\n?(.*?)```", re.DOTALL)
+
+
+def dumps_json(obj: Any, indent: bool = False) -> str:
+    """Serialize an object to a JSON string.
+
+    Args:
+        obj (Any): The object to serialize
+        indent (bool): Whether to indent the output by two spaces
+
+    Returns:
+        str: The JSON string
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode(
+            "utf-8"
+        )
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON string or bytes.
+
+    Args:
+        data (str or bytes): The JSON document
+
+    Returns:
+        Any: The decoded object
+
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def extract_json_array(
+    text: str, item_type: Optional[type] = None
+) -> Optional[List[Any]]:
+    """Extract the JSON array embedded in a block of text.
+
+    A fenced code block is tried first, then the bare arrays of the text in
+    order. Each candidate is decoded in place with `raw_decode`, which stops at
+    the end of the array instead of scanning for the last "]" and copying the
+    slice in between. A candidate that decodes but holds the wrong kind of items
+    (e.g. a "[1]" footnote in prose) is skipped. Arrays nested inside a
+    malformed array are never returned on their own, since they hold the wrong
+    data (e.g. the file list of one abstraction).
+
+    Args:
+        text (str): The text to search, e.g. an LLM response
+        item_type (type, optional): Type every item of the array must have
+
+    Returns:
+        list or None: The decoded array, or None if the text contains no valid array
+    """
+
+    def is_expected(value: Any) -> bool:
+        return isinstance(value, list) and (
+            item_type is None or all(isinstance(item, item_type) for item in value)
+        )
+
+    # Fast path: the whole response is the array
+    stripped = text.strip()
+    if stripped.startswith("[") and stripped.endswith("]"):
+        try:
+            value = loads_json(stripped)
+        except ValueError:
+            pass
+        else:
+            if is_expected(value):
+                return value
+
+    # Span of the first malformed array, for a single repair attempt
+    repair_span = None
+
+    fence = _FENCE_RE.search(text)
+    if fence:
+        fence_idx = text.find("[", fence.start(1), fence.end(1))
+        if fence_idx != -1:
+            try:
+                value, _ = _DECODER.raw_decode(text, fence_idx)
+            except json.JSONDecodeError:
+                repair_span = (fence_idx, fence.end(1))
+            else:
+                if is_expected(value):
+                    return value
+
+    # Bare arrays, in order. Complete arrays of the wrong kind are skipped as a
+    # whole; a malformed one ends the search, since only the arrays nested in
+    # it would follow.
+    idx = text.find("[")
+    while idx != -1:
+        if fence and fence.start() <= idx < fence.end():
+            idx = text.find("[", fence.end())
+            continue
+        try:
+            value, end = _DECODER.raw_decode(text, idx)
+        except json.JSONDecodeError:
+            if repair_span is None:
+                repair_span = (idx, len(text))
+            break
+        if is_expected(value):
+            return value
+        idx = text.find("[", end)
+
+    if repair_span is not None:
+        value = _repair_json_array(text, *repair_span)
+        if value is not None and is_expected(value):
+            return value
+    return None
+
+
+def _repair_json_array(text: str, start: int, end: int) -> Optional[List[Any]]:
+    """Repair a malformed JSON array with json-repair, if it is installed.
+
+    Args:
+        text (str): The text containing the array
+        start (int): Index of the array's opening "["
+        end (int): Index bounding the search for the array's closing "]"
+
+    Returns:
+        list or None: The repaired array, or None if it could not be recovered
+    """
+    if repair_json is None:
+        return None
+
+    close = text.rfind("]", start, end)
+    if close == -1:
+        return None
+
+    try:
+        value = repair_json(text[start : close + 1], return_objects=True)
+    except Exception:
+        return None
+
+    if isinstance(value, list) and value:
+        return value
+    return None
@@ -5,28 +5,151 @@ This module provides a unified interface for calling different LLM providers
 with enhanced features like retries, error handling, and token management.
 """
 
+import functools
 import hashlib
 import json
 import logging
 import os
+import threading
 import time
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
 
 import diskcache
 import google.generativeai as genai  # Import Google AI library
 import requests
 import tiktoken
+from requests.adapters import HTTPAdapter
 from google.api_core import \
     exceptions as google_api_exceptions  # Import Google API exceptions
 from tenacity import (retry, retry_if_exception_type, stop_after_attempt,
                       wait_exponential)
 
+from codetutorai.utils.json_utils import dumps_json, loads_json
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger("llm_client")
 
+# OpenAI models that accept a JSON schema `response_format` (structured output)
+STRUCTURED_OUTPUT_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+# Map UI display names to actual API model IDs
+MODEL_NAME_TO_API_ID = {
+    # Google
+    "Gemini 1.5 Flash": "gemini-1.5-flash-latest", # Assuming latest for flash
+    "Gemini 1.5 Pro": "gemini-1.5-pro-latest",
+    "Gemini 2.0 Flash": "gemini-2.0-flash", # Placeholder - Verify actual ID
+    "Gemini 2.5 Pro Preview": "gemini-2.5-pro-preview-03-25", # Placeholder - Verify actual ID
+
+    # OpenAI (Assuming UI names match common API IDs)
+    "GPT-4O": "gpt-4o",
+    "GPT-4 Turbo": "gpt-4-turbo",
+    "GPT-4": "gpt-4",
+    "GPT-3.5 Turbo": "gpt-3.5-turbo",
+
+    # Anthropic (Using provided IDs, assuming 'latest' maps correctly)
+    "Claude 3.5 Haiku": "claude-3-5-haiku-latest", # Placeholder - Verify actual ID
+    "Claude 3.5 Sonnet": "claude-3-5-sonnet-20240620",
+    "Claude 3.7 Sonnet": "claude-3-7-sonnet-latest", # Placeholder - Verify actual ID
+    "Claude 3 Opus": "claude-3-opus-20240229", # Assuming latest maps to this date version
+}
+
+# Conservative characters-per-token ratio for English text and code (typically
+# 3-4). Prompts shorter than this many characters per token of remaining budget
+# are assumed to be within the model's limit and are not tokenized.
+MIN_CHARS_PER_TOKEN = 3
+
+# Identical LLM calls currently in flight, shared across clients and threads
+_inflight_calls: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+# Connection pool sizing for the per-client HTTP session. The pool is sized for
+# the worker threads the nodes fan out to, so concurrent calls do not discard
+# pooled connections.
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+
+# Longest time in seconds call_batch waits for a batch job before cancelling it
+# and generating the remaining responses with individual calls. Batch jobs may
+# take up to 24 hours, which is far longer than a tutorial run should block.
+BATCH_MAX_WAIT = 60 * 60
+
+# In-memory LRU of recent cached responses, checked before the disk cache.
+# Entries are keyed by the cache directory as well as the cache key, so each
+# disk cache only ever sees its own responses.
+MAX_MEMO_ENTRIES = 256
+_response_memo: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _memo_get(cache_dir: str, key: str) -> Optional[str]:
+    """Get a response from the in-memory memo, marking it as recently used.
+
+    Args:
+        cache_dir (str): Absolute path of the disk cache the response belongs to
+        key (str): Cache key of the call
+
+    Returns:
+        str: The memoized response, or None if it is not in the memo
+    """
+    with _memo_lock:
+        response = _response_memo.get((cache_dir, key))
+        if response is not None:
+            _response_memo.move_to_end((cache_dir, key))
+        return response
+
+
+def _memo_put(cache_dir: str, key: str, response: str) -> None:
+    """Store a response in the in-memory memo, evicting the least recently used.
+
+    Args:
+        cache_dir (str): Absolute path of the disk cache the response belongs to
+        key (str): Cache key of the call
+        response (str): The response to store
+    """
+    with _memo_lock:
+        _response_memo[(cache_dir, key)] = response
+        _response_memo.move_to_end((cache_dir, key))
+        if len(_response_memo) > MAX_MEMO_ENTRIES:
+            _response_memo.popitem(last=False)
+
+
+def clear_response_memo(cache_dir: Optional[str] = None) -> None:
+    """Drop memoized responses, e.g. after the disk cache has been cleared.
+
+    Args:
+        cache_dir (str, optional): Cache directory whose responses to drop
+            (defaults to all cache directories)
+    """
+    with _memo_lock:
+        if cache_dir is None:
+            _response_memo.clear()
+            return
+        cache_dir = os.path.abspath(cache_dir)
+        for memo_key in [k for k in _response_memo if k[0] == cache_dir]:
+            del _response_memo[memo_key]
+
+
+@functools.lru_cache(maxsize=16)
+def _get_encoder(model: str):
+    """Get the tiktoken encoder for a model, loading each BPE table only once.
+
+    Args:
+        model (str): The model to get the encoder for
+
+    Returns:
+        tiktoken.Encoding: The encoder for the model
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Fall back to cl100k_base for models not directly supported
+        return tiktoken.get_encoding("cl100k_base")
+
 
 class TokenCounter:
     """Utility class for counting tokens in prompts."""
@@ -37,11 +160,7 @@ class TokenCounter:
         Args:
             model (str): The model to use for token counting
         """
-        try:
-            self.encoder = tiktoken.encoding_for_model(model)
-        except KeyError:
-            # Fall back to cl100k_base for models not directly supported
-            self.encoder = tiktoken.get_encoding("cl100k_base")
+        self.encoder = _get_encoder(model)
 
     def count_tokens(self, text: str) -> int:
         """Count the number of tokens in a text.
@@ -52,7 +171,9 @@ class TokenCounter:
         Returns:
             int: The number of tokens
         """
-        return len(self.encoder.encode(text))
+        # Count special-token text (e.g. "<|endoftext|>") as ordinary text
+        # instead of raising, since prompts embed arbitrary source files
+        return len(self.encoder.encode(text, disallowed_special=()))
 
 
 class LLMClient:
@@ -88,12 +209,30 @@ class LLMClient:
         self.timeout = timeout
         self.verbose = verbose
         self.cache_enabled = cache_enabled
+        self.cache_dir = os.path.abspath(cache_dir)
         self.cache = None
         if self.cache_enabled:
             os.makedirs(cache_dir, exist_ok=True)
             self.cache = diskcache.Cache(cache_dir)
             logger.info(f"LLM caching enabled. Cache directory: {cache_dir}")
 
+        # Reuse HTTP connections across calls. Nodes call the client from worker
+        # threads, and a shared session keeps the TLS connections to the provider
+        # alive between requests instead of reconnecting for every call.
+        self.session = requests.Session()
+        # Retries are handled by the tenacity decorators, so the adapter itself
+        # must not retry, otherwise failed requests would be retried twice
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=0,
+        )
+        self.session.mount("https://", adapter)
+
+        # Gemini model objects built by this client, keyed by model ID and
+        # system message. They are per client, never shared across API keys.
+        self._gemini_models: Dict[Tuple[str, Optional[str]], Any] = {}
+
         # Initialize token counter
         self.token_counter = TokenCounter(
             self.model if provider == "openai" else "gpt-4"
@@ -106,6 +245,18 @@ class LLMClient:
             f"Initialized LLM client with provider: {provider}, model: {self.model}"
         )
 
+    def close(self) -> None:
+        """Release the pooled HTTP connections and close the cache."""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self) -> "LLMClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
     def _get_api_key(self, provider: str) -> str:
         """Get the API key for the specified provider from environment variables.
 
@@ -154,6 +305,42 @@ class LLMClient:
 
         return default_models.get(provider.lower(), "gpt-4")
 
+    def _build_openai_payload(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        system_message: Optional[str],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Build the request body for the OpenAI chat completions endpoint.
+
+        Args:
+            prompt (str): The prompt to send to the API
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature
+            system_message (str, optional): System message to prepend
+            response_format (dict, optional): Structured output format for the response
+
+        Returns:
+            dict: The request body
+        """
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if response_format is not None:
+            data["response_format"] = response_format
+
+        return data
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
@@ -168,6 +355,7 @@ class LLMClient:
         max_tokens: int = 1000,
         temperature: float = 0.7,
         system_message: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
     ) -> str:
         """Call the OpenAI API.
 
@@ -176,6 +364,7 @@ class LLMClient:
             max_tokens (int): Maximum number of tokens to generate
             temperature (float): Sampling temperature
             system_message (str, optional): System message to prepend
+            response_format (dict, optional): Structured output format for the response
 
         Returns:
             str: The generated text
@@ -185,24 +374,16 @@ class LLMClient:
             "Authorization": f"Bearer {self.api_key}",
         }
 
-        messages = []
-        if system_message:
-            messages.append({"role": "system", "content": system_message})
-        messages.append({"role": "user", "content": prompt})
-
-        data = {
-            "model": self.model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-        }
+        data = self._build_openai_payload(
+            prompt, max_tokens, temperature, system_message, response_format
+        )
 
         logger.debug(f"Calling OpenAI API with model: {self.model}")
 
-        response = requests.post(
+        response = self.session.post(
             "https://api.openai.com/v1/chat/completions",
             headers=headers,
-            data=json.dumps(data),
+            data=dumps_json(data),
             timeout=self.timeout,
         )
 
@@ -255,10 +436,10 @@ class LLMClient:
 
         logger.debug(f"Calling Anthropic API with model: {self.model}")
 
-        response = requests.post(
+        response = self.session.post(
             "https://api.anthropic.com/v1/complete",
             headers=headers,
-            data=json.dumps(data),
+            data=dumps_json(data),
             timeout=self.timeout,
         )
 
@@ -300,44 +481,24 @@ class LLMClient:
             raise ValueError("Google API Key (GOOGLE_API_KEY) is required.")
 
         try:
+            # The SDK keeps its configuration globally and other clients may have
+            # configured a different key, so set this client's key before calling
             genai.configure(api_key=self.api_key)
 
-            # --- Model Name Mapping (Conceptual - needs proper implementation) ---
-            # This mapping should be more robustly handled, maybe in __init__
-            # Map UI display names to actual API model IDs
-            # NOTE: This mapping should ideally be centralized or loaded from config
-            MODEL_NAME_TO_API_ID = {
-                # Google
-                "Gemini 1.5 Flash": "gemini-1.5-flash-latest", # Assuming latest for flash
-                "Gemini 1.5 Pro": "gemini-1.5-pro-latest",
-                "Gemini 2.0 Flash": "gemini-2.0-flash", # Placeholder - Verify actual ID
-                "Gemini 2.5 Pro Preview": "gemini-2.5-pro-preview-03-25", # Placeholder - Verify actual ID
-
-                # OpenAI (Assuming UI names match common API IDs)
-                "GPT-4O": "gpt-4o",
-                "GPT-4 Turbo": "gpt-4-turbo",
-                "GPT-4": "gpt-4",
-                "GPT-3.5 Turbo": "gpt-3.5-turbo",
-
-                # Anthropic (Using provided IDs, assuming 'latest' maps correctly)
-                "Claude 3.5 Haiku": "claude-3-5-haiku-latest", # Placeholder - Verify actual ID
-                "Claude 3.5 Sonnet": "claude-3-5-sonnet-20240620",
-                "Claude 3.7 Sonnet": "claude-3-7-sonnet-latest", # Placeholder - Verify actual ID
-                "Claude 3 Opus": "claude-3-opus-20240229", # Assuming latest maps to this date version
-            }
             # Use the selected model from self.model (which comes from Streamlit state)
             # Default to a known working model if the mapping is missing
-            api_model_id = MODEL_NAME_TO_API_ID.get(self.model, "gemini-1.5-flash-latest")
             api_model_id = MODEL_NAME_TO_API_ID.get(self.model, "gemini-1.5-pro-latest") # Default if name not found
             logger.debug(f"Mapping UI model '{self.model}' to API ID '{api_model_id}'")
-            # --- End Mapping ---
-
 
-            model = genai.GenerativeModel(
-                model_name=api_model_id,
-                # Pass system instruction if provided and supported by the model version
-                system_instruction=system_message if system_message else None
-            )
+            model_key = (api_model_id, system_message or None)
+            model = self._gemini_models.get(model_key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name=api_model_id,
+                    # Pass system instruction if provided and supported by the model version
+                    system_instruction=system_message if system_message else None
+                )
+                self._gemini_models[model_key] = model
 
             generation_config = genai.types.GenerationConfig(
                 max_output_tokens=max_tokens,
@@ -386,13 +547,124 @@ class LLMClient:
             # Consider logging traceback here
             raise # Re-raise the exception
 
+    def supports_structured_output(self) -> bool:
+        """Check whether the configured model supports JSON schema structured output.
+
+        Returns:
+            bool: True if a `response_format` passed to `call` will be honoured
+        """
+        return self.provider == "openai" and self.model.startswith(
+            STRUCTURED_OUTPUT_MODEL_PREFIXES
+        )
+
+    def _get_cache_key(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        system_message: Optional[str],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Compute the cache key for an LLM call.
+
+        Args:
+            prompt (str): The prompt to send to the LLM
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature
+            system_message (str, optional): System message to prepend
+            response_format (dict, optional): Structured output format for the response
+
+        Returns:
+            str: Hex digest identifying the call
+        """
+        key_data = {
+            "provider": self.provider,
+            "model": self.model,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system_message": system_message,
+        }
+        # Only part of the key when set, so existing cache entries stay valid
+        if response_format is not None:
+            key_data["response_format"] = response_format
+        # Stdlib json with sorted keys keeps the keys of existing cache entries stable
+        key_string = json.dumps(key_data, sort_keys=True)
+        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
     def call(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        system_message: Optional[str] = None,
+        force_regeneration: bool = False,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Call the LLM provider with the given prompt, sharing identical in-flight calls.
+
+        Nodes make calls from several worker threads. If an identical call is
+        already in flight (same provider, model, prompt and sampling parameters),
+        this waits for its result instead of paying for a duplicate request.
+
+        Args:
+            prompt (str): The prompt to send to the LLM
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature
+            system_message (str, optional): System message to prepend
+            force_regeneration (bool): Whether to bypass the cache lookup
+            response_format (dict, optional): Structured output format for the response
+
+        Returns:
+            str: The generated text
+        """
+        key = self._get_cache_key(
+            prompt, max_tokens, temperature, system_message, response_format
+        )
+        # A forced regeneration must make a fresh call, so it never shares the
+        # result of an identical normal call that may be served from the cache
+        inflight_key = f"{key}:force" if force_regeneration else key
+
+        with _inflight_lock:
+            future = _inflight_calls.get(inflight_key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                _inflight_calls[inflight_key] = future
+
+        if not is_owner:
+            logger.debug(f"Waiting for identical in-flight call: {key[:8]}...")
+            return future.result()
+
+        try:
+            response = self._call(
+                prompt,
+                max_tokens,
+                temperature,
+                system_message,
+                force_regeneration,
+                response_format,
+                cache_key=key,
+            )
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with _inflight_lock:
+                del _inflight_calls[inflight_key]
+
+    def _call(
         self,
         prompt: str,
         max_tokens: int = 1000,
         temperature: float = 0.7,
         system_message: Optional[str] = None,
         force_regeneration: bool = False, # Added parameter to force regeneration
+        response_format: Optional[Dict[str, Any]] = None,
+        cache_key: Optional[str] = None,
     ) -> str:
         """Call the LLM provider with the given prompt.
 
@@ -401,6 +673,9 @@ class LLMClient:
             max_tokens (int): Maximum number of tokens to generate
             temperature (float): Sampling temperature
             system_message (str, optional): System message to prepend
+            force_regeneration (bool): Whether to bypass the cache lookup
+            response_format (dict, optional): Structured output format for the response
+            cache_key (str, optional): Precomputed cache key of the call
 
         Returns:
             str: The generated text
@@ -414,25 +689,22 @@ class LLMClient:
 
         if self.provider not in providers:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
-        cache_key = None
         # --- Caching Logic ---
-        cache_key = None
         # Calculate cache key if caching is enabled (needed for both lookup and storage)
         if self.cache_enabled and self.cache is not None:
-            key_data = {
-                "provider": self.provider,
-                "model": self.model,
-                "prompt": prompt,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "system_message": system_message,
-            }
-            key_string = json.dumps(key_data, sort_keys=True)
-            cache_key = hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+            if cache_key is None:
+                cache_key = self._get_cache_key(
+                    prompt, max_tokens, temperature, system_message, response_format
+                )
 
             # Attempt cache lookup only if NOT forcing regeneration
             if not force_regeneration:
-                cached_result = self.cache.get(cache_key)
+                # Recent responses are served from memory without a disk read
+                cached_result = _memo_get(self.cache_dir, cache_key)
+                if cached_result is None:
+                    cached_result = self.cache.get(cache_key)
+                    if cached_result is not None:
+                        _memo_put(self.cache_dir, cache_key, cached_result)
                 if cached_result is not None:
                     if self.verbose:
                         logger.debug(f"Cache hit for key: {cache_key[:8]}...")
@@ -446,28 +718,41 @@ class LLMClient:
                  logger.debug(f"Forcing regeneration for key: {cache_key[:8]}..., skipping cache check.")
         # --- End Caching Logic ---
 
-        # Check token count if using OpenAI
+        # Check token count if using OpenAI. Tokenizing a long prompt is costly,
+        # so the exact count only runs when the prompt is long enough to
+        # possibly approach the model's context limit.
         if self.provider == "openai":
-            token_count = self.token_counter.count_tokens(prompt)
-            if system_message:
-                token_count += self.token_counter.count_tokens(system_message)
+            if "gpt-4" in self.model:
+                token_limit, model_label = 8192, "GPT-4"
+            elif "gpt-3.5" in self.model:
+                token_limit, model_label = 4096, "GPT-3.5"
+            else:
+                token_limit = None
 
-            logger.debug(f"Prompt token count: {token_count}")
+            prompt_chars = len(prompt) + len(system_message or "")
+            if token_limit is not None and (
+                prompt_chars >= MIN_CHARS_PER_TOKEN * (token_limit - max_tokens)
+            ):
+                token_count = self.token_counter.count_tokens(prompt)
+                if system_message:
+                    token_count += self.token_counter.count_tokens(system_message)
 
-            # Check if we're approaching token limits
-            if token_count + max_tokens > 8192 and "gpt-4" in self.model:
-                logger.warning(
-                    f"Token count ({token_count} + {max_tokens}) approaching GPT-4 limit (8192)"
-                )
-            elif token_count + max_tokens > 4096 and "gpt-3.5" in self.model:
-                logger.warning(
-                    f"Token count ({token_count} + {max_tokens}) approaching GPT-3.5 limit (4096)"
-                )
+                logger.debug(f"Prompt token count: {token_count}")
+
+                # Check if we're approaching token limits
+                if token_count + max_tokens > token_limit:
+                    logger.warning(
+                        f"Token count ({token_count} + {max_tokens}) approaching {model_label} limit ({token_limit})"
+                    )
 
         try:
             start_time = time.time()
+            # Structured output is only supported by the OpenAI integration
+            extra_args = {}
+            if response_format is not None and self.supports_structured_output():
+                extra_args["response_format"] = response_format
             response = providers[self.provider](
-                prompt, max_tokens, temperature, system_message
+                prompt, max_tokens, temperature, system_message, **extra_args
             )
             elapsed_time = time.time() - start_time
 
@@ -476,6 +761,7 @@ class LLMClient:
             # Store in cache if caching is enabled (cache_key will be non-None if enabled)
             if self.cache_enabled and self.cache is not None:
                 self.cache.set(cache_key, response)
+                _memo_put(self.cache_dir, cache_key, response)
                 if self.verbose:
                     logger.debug(f"Stored result in cache for key: {cache_key[:8]}...")
             return response
@@ -483,6 +769,188 @@ class LLMClient:
             logger.error(f"Error calling {self.provider} LLM: {str(e)}")
             raise
 
+    def call_batch(
+        self,
+        prompts: Dict[str, str],
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        system_message: Optional[str] = None,
+        force_regeneration: bool = False,
+        poll_interval: int = 30,
+        max_wait: int = BATCH_MAX_WAIT,
+    ) -> Dict[str, str]:
+        """Generate responses for many prompts through the OpenAI Batch API.
+
+        Batch requests are billed at a discount but complete asynchronously
+        (within 24 hours), so this blocks while polling for the results. Cached
+        responses are reused and only the misses are submitted. Failed status
+        checks are retried at the next poll. If the batch is not done within
+        `max_wait` seconds it is cancelled, and prompts the batch does not answer
+        are retried individually with `call`.
+
+        Args:
+            prompts (dict): Mapping of custom IDs to prompts
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature
+            system_message (str, optional): System message to prepend to every prompt
+            force_regeneration (bool): Whether to bypass the cache
+            poll_interval (int): Seconds to wait between status checks
+            max_wait (int): Seconds to wait for the batch job before cancelling it
+
+        Returns:
+            dict: Mapping of custom IDs to generated text
+
+        Raises:
+            ValueError: If the provider does not support batching
+        """
+        if self.provider != "openai":
+            raise ValueError(f"Batch API is not supported for provider: {self.provider}")
+
+        responses = {}
+        cache_keys = {}
+        if self.cache_enabled and self.cache is not None:
+            for custom_id, prompt in prompts.items():
+                cache_key = self._get_cache_key(prompt, max_tokens, temperature, system_message)
+                cache_keys[custom_id] = cache_key
+                if not force_regeneration:
+                    cached_result = self.cache.get(cache_key)
+                    if cached_result is not None:
+                        responses[custom_id] = cached_result
+
+        pending = {
+            custom_id: prompt
+            for custom_id, prompt in prompts.items()
+            if custom_id not in responses
+        }
+        if not pending:
+            return responses
+
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+
+        # Upload the requests as a JSONL file
+        batch_input = "".join(
+            dumps_json(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._build_openai_payload(
+                        prompt, max_tokens, temperature, system_message
+                    ),
+                }
+            )
+            + "\n"
+            for custom_id, prompt in pending.items()
+        )
+        response = self.session.post(
+            "https://api.openai.com/v1/files",
+            headers=headers,
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", batch_input.encode("utf-8"))},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        input_file_id = response.json()["id"]
+
+        # Create the batch job
+        response = self.session.post(
+            "https://api.openai.com/v1/batches",
+            headers=headers,
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        batch = response.json()
+        logger.info(f"Submitted batch {batch['id']} with {len(pending)} requests")
+
+        batch_id = batch["id"]
+
+        # Poll until the batch job finishes or the wait runs out. The session does
+        # not retry, so a failed status check is simply repeated at the next poll.
+        deadline = time.monotonic() + max_wait
+        while batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"Batch {batch_id} did not finish within {max_wait}s, cancelling it")
+                self._cancel_batch(batch_id, headers)
+                break
+            time.sleep(min(poll_interval, remaining))
+            try:
+                response = self.session.get(
+                    f"https://api.openai.com/v1/batches/{batch_id}",
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                batch = response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"Checking the status of batch {batch_id} failed, retrying: {e}")
+                continue
+            logger.debug(f"Batch {batch_id} status: {batch['status']}")
+
+        # Download the results
+        if batch["status"] != "completed":
+            logger.warning(f"Batch {batch_id} ended with status: {batch['status']}")
+        elif batch.get("output_file_id"):
+            output_lines = []
+            try:
+                response = self.session.get(
+                    f"https://api.openai.com/v1/files/{batch['output_file_id']}/content",
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                output_lines = response.text.splitlines()
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Downloading the results of batch {batch_id} failed: {e}")
+
+            for line in output_lines:
+                if not line.strip():
+                    continue
+                result = loads_json(line)
+                custom_id = result.get("custom_id")
+                body = (result.get("response") or {}).get("body") or {}
+                if custom_id in pending and body.get("choices"):
+                    content = body["choices"][0]["message"]["content"]
+                    responses[custom_id] = content
+                    if custom_id in cache_keys:
+                        self.cache.set(cache_keys[custom_id], content)
+
+        # Retry the requests the batch did not answer individually
+        for custom_id, prompt in pending.items():
+            if custom_id not in responses:
+                logger.warning(f"No batch result for {custom_id}, calling the API directly")
+                responses[custom_id] = self.call(
+                    prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system_message=system_message,
+                    force_regeneration=True,
+                )
+
+        return responses
+
+    def _cancel_batch(self, batch_id: str, headers: Dict[str, str]) -> None:
+        """Cancel a batch job, ignoring failures since its results are not awaited.
+
+        Args:
+            batch_id (str): ID of the batch job
+            headers (dict): Authorization headers for the OpenAI API
+        """
+        try:
+            response = self.session.post(
+                f"https://api.openai.com/v1/batches/{batch_id}/cancel",
+                headers=headers,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Cancelling batch {batch_id} failed: {e}")
+
 
 # For backward compatibility with existing code
 def call_llm(
@@ -511,10 +979,10 @@ def call_llm(
     Returns:
         str: The generated text
     """
-    client = LLMClient(
+    with LLMClient(
         provider=provider,
         api_key=api_key,
         cache_enabled=cache_enabled,
         cache_dir=cache_dir
-    )
-    return client.call(prompt, max_tokens, temperature, system_message, force_regeneration=force_regeneration)
+    ) as client:
+        return client.call(prompt, max_tokens, temperature, system_message, force_regeneration=force_regeneration)
@@ -0,0 +1,33 @@
+"""Shared fixtures for the CodeTutorAI tests."""
+
+import pytest
+
+from codetutorai.utils import llm_client
+
+
+class FakeEncoder:
+    """Character-level stand-in for a tiktoken encoding.
+
+    Like tiktoken, it rejects special-token text unless `disallowed_special=()`
+    is passed, so the tests need no downloaded BPE tables.
+    """
+
+    special_tokens = ("<|endoftext|>",)
+
+    def encode(self, text, disallowed_special="all"):
+        if disallowed_special == "all":
+            for token in self.special_tokens:
+                if token in text:
+                    raise ValueError(f"Encountered text corresponding to disallowed special token {token!r}")
+        return [ord(char) for char in text]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+@pytest.fixture
+def fake_encoder(monkeypatch):
+    """Make every TokenCounter use the FakeEncoder."""
+    encoder = FakeEncoder()
+    monkeypatch.setattr(llm_client, "_get_encoder", lambda model: encoder)
+    return encoder
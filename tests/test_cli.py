@@ -0,0 +1,8 @@
+"""Tests for the command line interface."""
+
+from codetutorai.cli import parse_args
+from codetutorai.utils.constants import DEFAULT_BATCH_SIZE
+
+
+def test_batch_size_defaults_to_the_shared_constant():
+    assert parse_args(["https://github.com/owner/repo"]).batch_size == DEFAULT_BATCH_SIZE
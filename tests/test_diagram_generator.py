@@ -0,0 +1,116 @@
+"""Tests for generating Mermaid diagrams from Python sources."""
+
+import pytest
+
+from codetutorai.utils import diagram_generator
+from codetutorai.utils.diagram_generator import (
+    extract_classes,
+    extract_components,
+    generate_diagrams,
+)
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    """Count the calls that miss the diagrams cache, starting from an empty cache."""
+    monkeypatch.setattr(diagram_generator, "_diagrams_cache", type(diagram_generator._diagrams_cache)())
+    calls = []
+    parse = diagram_generator.parse_python_files
+
+    def counting_parse(contents):
+        calls.append(sorted(contents))
+        return parse(contents)
+
+    monkeypatch.setattr(diagram_generator, "parse_python_files", counting_parse)
+    return calls
+
+
+def _write_repo(repo_dir, source):
+    repo_dir.mkdir()
+    (repo_dir / "models.py").write_text(source, encoding="utf-8")
+    return str(repo_dir)
+
+
+def test_fresh_clone_of_unchanged_files_reuses_the_diagrams(tmp_path, parse_calls):
+    source = "class Base:\n    pass\n\nclass Child(Base):\n    def run(self):\n        pass\n"
+    abstractions = [{"name": "Models", "files": ["models.py"]}]
+
+    first = generate_diagrams(_write_repo(tmp_path / "clone1", source), abstractions)
+    second = generate_diagrams(_write_repo(tmp_path / "clone2", source), abstractions)
+
+    assert second == first
+    assert "Base <|-- Child" in first["class_diagram"]
+    assert len(parse_calls) == 1
+
+
+def test_changed_files_regenerate_the_diagrams(tmp_path, parse_calls):
+    abstractions = [{"name": "Models", "files": ["models.py"]}]
+
+    first = generate_diagrams(_write_repo(tmp_path / "clone1", "class Old:\n    pass\n"), abstractions)
+    second = generate_diagrams(_write_repo(tmp_path / "clone2", "class New:\n    pass\n"), abstractions)
+
+    assert "Old" in first["class_diagram"]
+    assert "New" in second["class_diagram"]
+    assert len(parse_calls) == 2
+
+
+SOURCE = """
+from pkg.base import Base, Mixin
+import os
+
+
+@decorated
+class Service(Base, Mixin):
+    def __init__(self):
+        pass
+
+    async def fetch(
+        self,
+        url,
+    ):
+        pass
+
+    def _helper(self):
+        pass
+
+    class Config:
+        pass
+"""
+
+
+def test_classes_are_extracted_from_the_syntax_tree():
+    classes = extract_classes({"pkg/service.py": SOURCE})
+
+    assert classes["Service"] == {
+        "file": "pkg/service.py",
+        "parents": ["Base", "Mixin"],
+        "methods": ["__init__", "fetch"],
+    }
+    assert classes["Config"]["parents"] == []
+
+
+def test_unparsable_files_fall_back_to_the_regex_scan():
+    source = "class Broken(Base):\n    def run(self):\n        pass\n    def oops(self:\n"
+
+    classes = extract_classes({"broken.py": source})
+
+    assert classes == {"Broken": {"file": "broken.py", "parents": ["Base"], "methods": ["run"]}}
+
+
+def test_components_resolve_dependencies_between_modules():
+    contents = {
+        "pkg/base.py": "class Base:\n    pass\n",
+        "pkg/service.py": SOURCE,
+        "broken.py": "from pkg.service import Service\ndef oops(:\n",
+    }
+
+    components = extract_components(contents)
+
+    assert components["pkg.service"]["imports"] == [
+        ("pkg.base", "Base"),
+        ("pkg.base", "Mixin"),
+        ("os", "os"),
+    ]
+    assert components["pkg.service"]["dependencies"] == ["pkg.base"]
+    assert components["broken"]["dependencies"] == ["pkg.service"]
+    assert components["pkg.base"]["dependencies"] == []
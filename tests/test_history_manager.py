@@ -0,0 +1,96 @@
+"""Tests for the JSON Lines generation history."""
+
+import json
+
+from codetutorai.utils.history_manager import (
+    DEFAULT_HISTORY_FILENAME,
+    LEGACY_HISTORY_FILENAME,
+    load_generation_history,
+    load_github_url_history,
+    migrate_legacy_history,
+    save_generation_metadata,
+)
+
+
+def test_save_appends_one_line_per_run(tmp_path):
+    history_file = tmp_path / DEFAULT_HISTORY_FILENAME
+
+    save_generation_metadata({"repo_url": "https://github.com/a/one"}, history_file)
+    save_generation_metadata({"repo_url": "https://github.com/a/two"}, history_file)
+
+    lines = history_file.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["repo_url"] for line in lines] == [
+        "https://github.com/a/one",
+        "https://github.com/a/two",
+    ]
+    assert all("timestamp" in json.loads(line) for line in lines)
+
+
+def test_legacy_history_is_migrated(tmp_path):
+    legacy_file = tmp_path / LEGACY_HISTORY_FILENAME
+    history_file = tmp_path / DEFAULT_HISTORY_FILENAME
+    entries = [{"repo_url": "https://github.com/a/one"}, {"repo_url": "https://github.com/a/two"}]
+    legacy_file.write_text(json.dumps(entries, indent=4), encoding="utf-8")
+
+    assert migrate_legacy_history(legacy_file, history_file)
+
+    assert not legacy_file.exists()
+    assert load_generation_history(history_file) == entries
+
+
+def test_legacy_history_is_migrated_on_first_load(tmp_path):
+    legacy_file = tmp_path / LEGACY_HISTORY_FILENAME
+    history_file = tmp_path / DEFAULT_HISTORY_FILENAME
+    legacy_file.write_text(json.dumps([{"repo_url": "https://github.com/a/one"}]), encoding="utf-8")
+
+    assert load_generation_history(history_file) == [{"repo_url": "https://github.com/a/one"}]
+    assert history_file.exists()
+    assert not legacy_file.exists()
+
+
+def test_legacy_history_that_is_not_a_list_is_left_alone(tmp_path):
+    legacy_file = tmp_path / LEGACY_HISTORY_FILENAME
+    history_file = tmp_path / DEFAULT_HISTORY_FILENAME
+    legacy_file.write_text('{"repo_url": "https://github.com/a/one"}', encoding="utf-8")
+
+    assert not migrate_legacy_history(legacy_file, history_file)
+
+    assert legacy_file.exists()
+    assert not history_file.exists()
+
+
+def test_malformed_lines_are_skipped(tmp_path):
+    history_file = tmp_path / DEFAULT_HISTORY_FILENAME
+    history_file.write_text(
+        '{"repo_url": "https://github.com/a/one"}\n'
+        "not json\n"
+        "\n"
+        '["not", "an", "object"]\n'
+        '{"repo_url": "https://github.com/a/two"}\n',
+        encoding="utf-8",
+    )
+
+    assert load_generation_history(history_file) == [
+        {"repo_url": "https://github.com/a/one"},
+        {"repo_url": "https://github.com/a/two"},
+    ]
+
+
+def test_missing_history_is_empty(tmp_path):
+    assert load_generation_history(tmp_path / DEFAULT_HISTORY_FILENAME) == []
+
+
+def test_url_history_is_unique_valid_and_refreshed_after_save(tmp_path):
+    history_file = tmp_path / DEFAULT_HISTORY_FILENAME
+    save_generation_metadata({"repo_url": "https://github.com/b/two"}, history_file)
+    save_generation_metadata({"repo_url": "not a url"}, history_file)
+    save_generation_metadata({"repo_url": "https://github.com/b/two"}, history_file)
+
+    assert load_github_url_history(history_file) == ["https://github.com/b/two"]
+
+    save_generation_metadata({"repo_url": "https://github.com/a/one"}, history_file)
+
+    assert load_github_url_history(history_file) == [
+        "https://github.com/a/one",
+        "https://github.com/b/two",
+    ]
@@ -0,0 +1,148 @@
+"""Tests for identifying abstractions from LLM responses."""
+
+import pytest
+
+from codetutorai.nodes.identify_abstractions import IdentifyAbstractionsNode
+from codetutorai.utils.llm_client import LLMClient
+
+
+@pytest.fixture
+def node():
+    return IdentifyAbstractionsNode()
+
+
+def test_json_response_is_parsed_and_files_filtered(node):
+    response = '```json\n[{"name": "Parser", "description": "Parses", "files": ["a.py", "missing.py"]}]\n```'
+
+    assert node._parse_abstraction_response(response, ["a.py", "b.py"]) == [
+        {"name": "Parser", "description": "Parses", "files": ["a.py"]}
+    ]
+
+
+def test_array_without_valid_abstractions_falls_back_to_markdown(node):
+    response = (
+        '[{"title": "not an abstraction"}]\n\n'
+        "# Parser\nDescription: Parses the input\nFiles: a.py, missing.py\n"
+    )
+
+    assert node._parse_abstraction_response(response, ["a.py"]) == [
+        {"name": "Parser", "description": "Parses the input", "files": ["a.py"]}
+    ]
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Replace the LLM call with a canned response and record the prompts."""
+    prompts = []
+
+    def fake_call(self, prompt, **kwargs):
+        prompts.append(prompt)
+        return '[{"name": "Parser", "description": "Parses", "files": ["src/a.py"]}]'
+
+    monkeypatch.setattr(LLMClient, "call", fake_call)
+    return prompts
+
+
+def _context(tmp_path, **overrides):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir(exist_ok=True)
+    context = {
+        "file_paths": ["src/a.py"],
+        "repo_dir": str(tmp_path / "missing-clone"),
+        "repo_name": "repo",
+        "repo_metadata": {"description": "A repository"},
+        "output_dir": str(output_dir),
+        "api_key": "test-key",
+        "cache_enabled": True,
+        "cache_dir": str(tmp_path / "cache"),
+    }
+    context.update(overrides)
+    return context
+
+
+def test_abstractions_are_cached_across_runs(node, llm_calls, fake_encoder, tmp_path):
+    first = node.process(_context(tmp_path))
+    second = node.process(_context(tmp_path))
+
+    assert second == first
+    assert len(llm_calls) == 1
+
+
+def test_abstractions_cache_key_covers_the_prompt_inputs(node, llm_calls, fake_encoder, tmp_path):
+    node.process(_context(tmp_path))
+    node.process(_context(tmp_path, repo_name="other-repo"))
+    node.process(_context(tmp_path, web_content={"https://example.com": {"title": "Docs", "content": "Guide"}}))
+    node.process(_context(tmp_path, language="fr"))
+
+    assert len(llm_calls) == 4
+
+
+def test_abstractions_cache_key_covers_the_model(node):
+    key = node._get_abstractions_cache_key(
+        ["src/a.py"], "repo", {"description": ""}, "", "openai", "gpt-4", {}
+    )
+
+    assert key == node._get_abstractions_cache_key(
+        ["src/a.py"], "repo", {"description": ""}, "", "openai", "gpt-4", {}
+    )
+    assert key != node._get_abstractions_cache_key(
+        ["src/a.py"], "repo", {"description": ""}, "", "openai", "gpt-4o", {}
+    )
+
+
+@pytest.mark.parametrize("name", ["Parser", " parser ", "Class Parser", "parser class", "MODULE parser"])
+def test_kind_words_and_case_are_ignored_in_canonical_names(node, name):
+    assert node._canonical_name(name) == "parser"
+
+
+def test_kind_words_inside_a_name_are_kept(node):
+    assert node._canonical_name("Subclass Registry") == "subclass registry"
+
+
+def test_duplicate_abstractions_are_merged(node):
+    abstractions = [
+        {"name": "Parser", "description": "Short", "files": ["a.py"]},
+        {"name": "Lexer", "description": "Tokens", "files": ["l.py"]},
+        {"name": "parser class", "description": "Longer description", "files": ["b.py", "a.py"]},
+        {"name": "parser class", "description": "Long", "files": ["c.py"]},
+    ]
+
+    assert node._deduplicate_abstractions(abstractions) == [
+        {"name": "parser class", "description": "Longer description", "files": ["a.py", "b.py", "c.py"]},
+        {"name": "Lexer", "description": "Tokens", "files": ["l.py"]},
+    ]
+
+
+def test_files_are_grouped_by_parent_directory(node):
+    assert node._group_files_by_directory(["setup.py", "src/pkg/a.py", "docs/pkg/b.md"]) == {
+        "root": ["setup.py"],
+        "pkg": ["src/pkg/a.py", "docs/pkg/b.md"],
+    }
+
+
+def test_groups_within_the_chunk_size_are_not_split(node):
+    groups = {"pkg": ["pkg/a.py", "pkg/b.py"], "root": ["setup.py"]}
+
+    assert node._shard_file_groups(groups, 100) == [
+        ("pkg", ["pkg/a.py", "pkg/b.py"]),
+        ("root", ["setup.py"]),
+    ]
+
+
+def test_large_groups_are_split_into_numbered_shards(node):
+    # Each entry is listed as "- pkg/x.py\n", 11 characters
+    groups = {"pkg": ["pkg/a.py", "pkg/b.py", "pkg/c.py"]}
+
+    assert node._shard_file_groups(groups, 22) == [
+        ("pkg (part 1/2)", ["pkg/a.py", "pkg/b.py"]),
+        ("pkg (part 2/2)", ["pkg/c.py"]),
+    ]
+
+
+def test_a_file_longer_than_the_chunk_size_gets_its_own_shard(node):
+    groups = {"pkg": ["pkg/a_very_long_module_name.py", "pkg/b.py"]}
+
+    assert node._shard_file_groups(groups, 10) == [
+        ("pkg (part 1/2)", ["pkg/a_very_long_module_name.py"]),
+        ("pkg (part 2/2)", ["pkg/b.py"]),
+    ]
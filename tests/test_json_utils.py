@@ -0,0 +1,84 @@
+"""Tests for extracting JSON arrays from LLM responses."""
+
+import pytest
+
+from codetutorai.utils import json_utils
+from codetutorai.utils.json_utils import extract_json_array
+
+
+@pytest.fixture
+def no_repair(monkeypatch):
+    """Run without json-repair, as when the optional dependency is missing."""
+    monkeypatch.setattr(json_utils, "repair_json", None)
+
+
+def test_whole_response_is_the_array():
+    assert extract_json_array(' ["A", "B"] \n') == ["A", "B"]
+
+
+def test_array_surrounded_by_prose():
+    assert extract_json_array('Here you go: ["A", "B"]. Done.') == ["A", "B"]
+
+
+def test_array_in_fenced_code_block():
+    response = 'The order [as requested]:\n```json\n["A", "B"]\n```\nThanks!'
+    assert extract_json_array(response) == ["A", "B"]
+
+
+def test_array_inside_an_object():
+    assert extract_json_array('{"order": ["A", "B"]}') == ["A", "B"]
+
+
+def test_nested_arrays_are_kept_in_the_outer_array():
+    response = '[{"name": "A", "files": ["a.py", "b.py"]}, {"name": "B", "files": []}]'
+    assert extract_json_array(response) == [
+        {"name": "A", "files": ["a.py", "b.py"]},
+        {"name": "B", "files": []},
+    ]
+
+
+def test_malformed_outer_array_does_not_return_a_nested_array(no_repair):
+    response = '[{"name": "A", "files": ["a.py", "b.py"]},]'
+    assert extract_json_array(response) is None
+
+
+def test_malformed_fenced_array_does_not_return_a_nested_array(no_repair):
+    response = '```json\n[{"name": "A", "files": ["a.py"]}, {"name": "B",]\n```'
+    assert extract_json_array(response) is None
+
+
+def test_no_array(no_repair):
+    assert extract_json_array("There are no chapters to order.") is None
+
+
+def test_repair_runs_once_on_the_outermost_array(monkeypatch):
+    repaired = []
+
+    def fake_repair(text, return_objects):
+        repaired.append(text)
+        return ["repaired"]
+
+    monkeypatch.setattr(json_utils, "repair_json", fake_repair)
+    response = 'Note [1:\n```json\n["A", "B",]\n```\n[trailing]'
+
+    assert extract_json_array(response) == ["repaired"]
+    assert repaired == ['["A", "B",]']
+
+
+def test_prose_brackets_before_a_fenced_block():
+    response = 'See note [1] below.\n```json\n["A", "B"]\n```'
+    assert extract_json_array(response) == ["A", "B"]
+
+
+def test_bare_array_of_the_wrong_kind_is_skipped():
+    response = 'Step [1] done, result: [{"name": "A"}]'
+    assert extract_json_array(response, item_type=dict) == [{"name": "A"}]
+
+
+def test_fenced_array_of_the_wrong_kind_falls_back_to_bare_arrays():
+    response = '```json\n["a.py"]\n```\nAbstractions: [{"name": "A"}]'
+    assert extract_json_array(response, item_type=dict) == [{"name": "A"}]
+
+
+def test_no_array_of_the_expected_kind(no_repair):
+    assert extract_json_array("Sections [1] and [2].", item_type=str) is None
@@ -0,0 +1,285 @@
+"""Tests for the LLM client."""
+
+import threading
+
+import pytest
+import requests
+
+from codetutorai.utils import llm_client
+from codetutorai.utils.llm_client import LLMClient
+
+
+class FakeResponse:
+    def __init__(self, payload=None, text="", status_code=200):
+        self.payload = payload
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self.payload
+
+
+class FakeBatchSession:
+    """Stand-in for the client's HTTP session, serving scripted batch statuses."""
+
+    def __init__(self, statuses, output=""):
+        self.statuses = list(statuses)
+        self.output = output
+        self.cancelled = False
+
+    def post(self, url, **kwargs):
+        if url.endswith("/files"):
+            return FakeResponse({"id": "file-in"})
+        if url.endswith("/cancel"):
+            self.cancelled = True
+            return FakeResponse({"id": "batch-1", "status": "cancelling"})
+        return FakeResponse({"id": "batch-1", "status": "validating"})
+
+    def get(self, url, **kwargs):
+        if url.endswith("/content"):
+            return FakeResponse(text=self.output)
+        status = self.statuses.pop(0)
+        if isinstance(status, Exception):
+            raise status
+        if isinstance(status, int):
+            return FakeResponse(status_code=status)
+        return FakeResponse({"id": "batch-1", "status": status, "output_file_id": "file-out"})
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(fake_encoder, monkeypatch):
+    monkeypatch.setattr(llm_client.time, "sleep", lambda seconds: None)
+    with LLMClient(provider="openai", api_key="test-key") as client:
+        yield client
+
+
+@pytest.fixture
+def direct_calls(monkeypatch):
+    """Replace individual LLM calls and record their prompts."""
+    prompts = []
+
+    def fake_call(self, prompt, **kwargs):
+        prompts.append(prompt)
+        return f"direct: {prompt}"
+
+    monkeypatch.setattr(LLMClient, "call", fake_call)
+    return prompts
+
+
+def _output_line(custom_id, content):
+    return llm_client.dumps_json(
+        {
+            "custom_id": custom_id,
+            "response": {"body": {"choices": [{"message": {"content": content}}]}},
+        }
+    )
+
+
+def test_failed_status_checks_are_retried(client, direct_calls):
+    client.session = FakeBatchSession(
+        [requests.exceptions.ConnectionError("reset"), 503, "in_progress", "completed"],
+        output=_output_line("a", "batched: A") + "\n",
+    )
+
+    responses = client.call_batch({"a": "A", "b": "B"})
+
+    assert responses == {"a": "batched: A", "b": "direct: B"}
+    assert direct_calls == ["B"]
+
+
+def test_batch_is_cancelled_after_the_max_wait(client, direct_calls):
+    client.session = FakeBatchSession([])
+
+    responses = client.call_batch({"a": "A", "b": "B"}, max_wait=0)
+
+    assert client.session.cancelled
+    assert responses == {"a": "direct: A", "b": "direct: B"}
+
+
+def test_failed_batch_falls_back_to_individual_calls(client, direct_calls):
+    client.session = FakeBatchSession(["failed"])
+
+    assert client.call_batch({"a": "A"}) == {"a": "direct: A"}
+
+
+class BlockingProvider:
+    """Stand-in for call_openai that holds every call until released."""
+
+    def __init__(self):
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def __call__(self, prompt, max_tokens, temperature, system_message, **kwargs):
+        with self.lock:
+            self.prompts.append(prompt)
+        self.started.release()
+        assert self.release.wait(5)
+        return f"response {len(self.prompts)}"
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = BlockingProvider()
+    monkeypatch.setattr(LLMClient, "call_openai", provider)
+    return provider
+
+
+@pytest.fixture
+def waiting(monkeypatch):
+    """Signal when a call starts waiting for an identical in-flight call."""
+    event = threading.Event()
+
+    class SignallingFuture(llm_client.Future):
+        def result(self, timeout=None):
+            event.set()
+            return super().result(timeout)
+
+    monkeypatch.setattr(llm_client, "Future", SignallingFuture)
+    return event
+
+
+def _call_in_thread(client, results, name, prompt, **kwargs):
+    def run():
+        try:
+            results[name] = client.call(prompt, **kwargs)
+        except Exception as e:
+            results[name] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_identical_in_flight_calls_share_one_request(client, provider, waiting):
+    results = {}
+    first = _call_in_thread(client, results, "first", "Explain")
+    assert provider.started.acquire(timeout=5)
+    second = _call_in_thread(client, results, "second", "Explain")
+    assert waiting.wait(5)
+
+    provider.release.set()
+    first.join(5)
+    second.join(5)
+
+    assert provider.prompts == ["Explain"]
+    assert results == {"first": "response 1", "second": "response 1"}
+    assert not llm_client._inflight_calls
+
+
+def test_forced_regeneration_does_not_share_a_normal_call(client, provider):
+    results = {}
+    normal = _call_in_thread(client, results, "normal", "Explain")
+    assert provider.started.acquire(timeout=5)
+    forced = _call_in_thread(client, results, "forced", "Explain", force_regeneration=True)
+    assert provider.started.acquire(timeout=5)
+
+    provider.release.set()
+    normal.join(5)
+    forced.join(5)
+
+    assert provider.prompts == ["Explain", "Explain"]
+
+
+def test_waiting_calls_get_the_error_of_the_shared_call(client, monkeypatch, waiting):
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_provider(self, prompt, *args, **kwargs):
+        started.set()
+        assert release.wait(5)
+        raise ValueError("bad request")
+
+    monkeypatch.setattr(LLMClient, "call_openai", failing_provider)
+
+    results = {}
+    first = _call_in_thread(client, results, "first", "Explain")
+    assert started.wait(5)
+    second = _call_in_thread(client, results, "second", "Explain")
+    assert waiting.wait(5)
+
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert isinstance(results["first"], ValueError)
+    assert results["second"] is results["first"]
+    assert not llm_client._inflight_calls
+
+
+@pytest.fixture
+def memo(monkeypatch):
+    """Start from an empty response memo and restore it afterwards."""
+    monkeypatch.setattr(llm_client, "_response_memo", type(llm_client._response_memo)())
+    return llm_client._response_memo
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    prompts = []
+
+    def fake_provider(self, prompt, *args, **kwargs):
+        prompts.append(prompt)
+        return f"response to {prompt}"
+
+    monkeypatch.setattr(LLMClient, "call_openai", fake_provider)
+    return prompts
+
+
+def _cached_client(cache_dir):
+    return LLMClient(provider="openai", api_key="test-key", cache_enabled=True, cache_dir=str(cache_dir))
+
+
+def test_cached_responses_are_served_from_the_memo(fake_encoder, memo, provider_calls, tmp_path):
+    with _cached_client(tmp_path / "cache") as client:
+        assert client.call("Explain") == "response to Explain"
+        client.cache.clear()  # A memo hit never reaches the disk cache
+
+        assert client.call("Explain") == "response to Explain"
+        assert provider_calls == ["Explain"]
+
+
+def test_clearing_the_memo_falls_back_to_the_disk_cache(fake_encoder, memo, provider_calls, tmp_path):
+    with _cached_client(tmp_path / "cache") as client:
+        client.call("Explain")
+        llm_client.clear_response_memo(str(tmp_path / "cache"))
+        assert not memo
+
+        assert client.call("Explain") == "response to Explain"
+        assert provider_calls == ["Explain"]
+
+        client.cache.clear()
+        llm_client.clear_response_memo()
+        client.call("Explain")
+        assert provider_calls == ["Explain", "Explain"]
+
+
+def test_memo_entries_are_kept_per_cache_directory(fake_encoder, memo, provider_calls, tmp_path):
+    with _cached_client(tmp_path / "first") as first, _cached_client(tmp_path / "second") as second:
+        first.call("Explain")
+        second.call("Explain")
+
+        assert provider_calls == ["Explain", "Explain"]
+
+        llm_client.clear_response_memo(str(tmp_path / "first"))
+        assert [cache_dir for cache_dir, _ in memo] == [second.cache_dir]
+
+
+def test_memo_evicts_the_least_recently_used_response(memo, monkeypatch):
+    monkeypatch.setattr(llm_client, "MAX_MEMO_ENTRIES", 2)
+
+    llm_client._memo_put("cache", "a", "A")
+    llm_client._memo_put("cache", "b", "B")
+    assert llm_client._memo_get("cache", "a") == "A"
+    llm_client._memo_put("cache", "c", "C")
+
+    assert llm_client._memo_get("cache", "b") is None
+    assert [key for _, key in memo] == ["a", "c"]
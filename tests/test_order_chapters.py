@@ -0,0 +1,52 @@
+"""Tests for the topological chapter ordering."""
+
+import pytest
+
+from codetutorai.nodes.order_chapters import OrderChaptersNode
+
+
+def _abstractions(*names):
+    return [{"name": name, "description": name, "files": []} for name in names]
+
+
+@pytest.fixture
+def node():
+    return OrderChaptersNode()
+
+
+def test_dependencies_are_ordered_before_their_dependents(node):
+    abstractions = _abstractions("C", "B", "A")
+    relationships = {"A": ["B"], "B": ["C"]}
+
+    assert node._order_topological(abstractions, relationships, False) == ["A", "B", "C"]
+
+
+def test_independent_chapters_keep_input_order(node):
+    abstractions = _abstractions("A", "B", "C")
+
+    assert node._order_topological(abstractions, {}, False) == ["A", "B", "C"]
+
+
+def test_self_edges_duplicates_and_unknown_names_are_ignored(node):
+    abstractions = _abstractions("B", "A")
+    relationships = {"A": ["A", "B", "B", "Missing"], "B": ["B"]}
+
+    assert node._order_topological(abstractions, relationships, False) == ["A", "B"]
+
+
+def test_cycles_are_broken_and_every_chapter_is_placed_once(node):
+    abstractions = _abstractions("A", "B", "C", "D")
+    relationships = {"A": ["B"], "B": ["C"], "C": ["A"], "D": ["A"]}
+
+    order = node._order_topological(abstractions, relationships, False)
+
+    assert sorted(order) == ["A", "B", "C", "D"]
+    assert order[0] == "D"
+    # Once the cycle is broken, the rest of it follows its edges
+    assert order[1:] in (["A", "B", "C"], ["B", "C", "A"], ["C", "A", "B"])
+
+
+def test_duplicate_names_collapse_to_one_chapter(node):
+    abstractions = _abstractions("A", "B", "A")
+
+    assert node._order_topological(abstractions, {"B": ["A"]}, False) == ["B", "A"]
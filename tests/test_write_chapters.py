@@ -0,0 +1,42 @@
+"""Tests for building chapter prompts."""
+
+import pytest
+
+from codetutorai.nodes.write_chapters import WriteChaptersNode
+from codetutorai.utils.llm_client import TokenCounter
+
+
+@pytest.fixture
+def node():
+    return WriteChaptersNode()
+
+
+@pytest.fixture
+def token_counter(fake_encoder):
+    return TokenCounter()
+
+
+def test_short_text_is_kept(node, token_counter):
+    assert node._truncate_to_tokens("abc", 3, token_counter) == "abc"
+
+
+def test_long_text_is_truncated_with_a_marker(node, token_counter):
+    assert node._truncate_to_tokens("abcdef", 4, token_counter) == "abcd\n... [truncated]"
+
+
+def test_special_token_text_is_truncated_as_plain_text(node, token_counter):
+    text = 'EOT = "<|endoftext|>"'
+
+    assert node._truncate_to_tokens(text, 100, token_counter) == text
+
+
+def test_file_with_special_token_text_is_read(node, token_counter, tmp_path):
+    (tmp_path / "tokenizer.py").write_text('EOT = "<|endoftext|>"\n', encoding="utf-8")
+
+    content = node._read_file_for_prompt(str(tmp_path), "tokenizer.py", 100, token_counter)
+
+    assert content == 'EOT = "<|endoftext|>"\n'
+
+
+def test_token_counter_counts_special_token_text(token_counter):
+    assert token_counter.count_tokens("<|endoftext|>") == len("<|endoftext|>")